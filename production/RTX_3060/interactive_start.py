@@ -3,6 +3,7 @@
 ASE Restaurant Surveillance System - Configuration Library v3.0
 Created: 2025-11-16
 Modified: 2025-11-16 - Library for configuration functionality (imported by initialize_restaurant.py)
+Modified: 2026-10-17 - Camera connection tests run in parallel
 
 ⚠️  NOTICE: This file is a LIBRARY, not an entry point!
     DO NOT execute this file directly.
@@ -33,14 +34,19 @@ New Usage (v4.0 Architecture):
 """
 
 import os
+import re
 import sys
 import json
 import time
+import base64
+import socket
+import hashlib
 import sqlite3
 import subprocess
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Tuple, Optional, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import shutil
 
 # Color codes for terminal output
@@ -62,9 +68,21 @@ DB_PATH = PROJECT_ROOT / "db" / "detection_data.db"
 MODELS_DIR = PROJECT_ROOT / "models"
 LOGS_DIR = PROJECT_ROOT / "logs"
 
+# Camera testing
+CAMERA_TEST_WORKERS = 8  # Cameras probed concurrently (RTSP handshakes are I/O bound)
+CAMERA_OPEN_TIMEOUT_MS = 5000  # FFmpeg-enforced RTSP open timeout
+CAMERA_READ_TIMEOUT_MS = 5000  # FFmpeg-enforced first-frame read timeout
+
 # Add scripts to path
 sys.path.insert(0, str(SCRIPTS_DIR))
 
+# OpenCV's FFmpeg backend: RTSP over TCP (matches production capture), small
+# jitter buffer and a socket-level timeout so unreachable cameras fail fast
+os.environ.setdefault(
+    'OPENCV_FFMPEG_CAPTURE_OPTIONS',
+    f'rtsp_transport;tcp|stimeout;{CAMERA_OPEN_TIMEOUT_MS * 1000}|max_delay;500000|buffer_size;65536'
+)
+
 
 class InteractiveStartup:
     """
@@ -184,8 +202,13 @@ class InteractiveStartup:
 
         all_passed = True
 
-        for name, check_func in checks:
-            status, message = check_func()
+        # Checks are independent; run them together so the network ping and
+        # nvidia-smi timeouts overlap instead of adding up
+        with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+            futures = [executor.submit(check_func) for _, check_func in checks]
+            results = [future.result() for future in futures]
+
+        for (name, _), (status, message) in zip(checks, results):
 
             if status == "ok":
                 print(f"✅ {name}: {Colors.GREEN}{message}{Colors.RESET}")
@@ -1010,17 +1033,24 @@ class InteractiveStartup:
         print("=" * 72 + "\n")
 
         print(f"Testing RTSP connections for {len(self.cameras)} cameras...")
-        print("This may take 10-20 seconds per camera.\n")
+        print("Cameras are tested in parallel; this may take 10-20 seconds.\n")
         print("─" * 72 + "\n")
 
-        # Test all cameras
-        for i, camera in enumerate(self.cameras, 1):
-            print(f"[{i}/{len(self.cameras)}] Testing {Colors.CYAN}{camera['id']}{Colors.RESET} ({camera.get('ip', 'N/A')}:{camera.get('port', 554)})")
+        # Test all cameras concurrently; results are printed as each finishes
+        if self.cameras:
+            workers = min(CAMERA_TEST_WORKERS, len(self.cameras))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(self.probe_camera, camera): camera for camera in self.cameras}
 
-            success = self.test_camera_connection(camera, verbose=True)
-            self.camera_test_results[camera['id']] = success
+                for i, future in enumerate(as_completed(futures), 1):
+                    camera = futures[future]
+                    success, lines = future.result()
+                    self.camera_test_results[camera['id']] = success
 
-            print()
+                    print(f"[{i}/{len(self.cameras)}] Tested {Colors.CYAN}{camera['id']}{Colors.RESET} ({camera.get('ip', 'N/A')}:{camera.get('port', 554)})")
+                    for line in lines:
+                        print(line)
+                    print()
 
         # Summary
         passed = sum(self.camera_test_results.values())
@@ -1043,57 +1073,244 @@ class InteractiveStartup:
 
     def test_camera_connection(self, camera: Dict, verbose: bool = False) -> bool:
         """Test a single camera connection using OpenCV"""
+        success, lines = self.probe_camera(camera)
+
+        if verbose:
+            for line in lines:
+                print(line)
+
+        return success
+
+    def probe_camera(self, camera: Dict) -> Tuple[bool, List[str]]:
+        """
+        Probe a single camera's RTSP stream
+
+        Output is collected instead of printed so several cameras can be
+        probed from worker threads without interleaving their messages.
+
+        Returns:
+            (success, status lines to display)
+        """
+        lines = []
+
+        # Build RTSP URL
+        ip = camera.get('ip', '')
+        port = camera.get('port', 554)
+        username = camera.get('username', 'admin')
+        password = camera.get('password', '123456')
+        stream_path = camera.get('stream_path', '/media/video1')
+
+        rtsp_url = f"rtsp://{username}:{password}@{ip}:{port}{stream_path}"
+
+        lines.append(f"  ⏳ Connecting to rtsp://{username}:***@{ip}:{port}{stream_path}")
+
+        # A bare DESCRIBE settles reachability and credentials in one round
+        # trip, so bad cameras fail before any stream is opened
+        auth = self.rtsp_auth_probe(ip, port, stream_path, username, password)
+        if auth == 'unreachable':
+            lines.append(f"  {Colors.RED}❌ Connection failed (RTSP port {port} unreachable){Colors.RESET}")
+            return False, lines
+        if auth == 'unauthorized':
+            lines.append(f"  {Colors.RED}❌ Connection failed (authentication rejected){Colors.RESET}")
+            return False, lines
+
+        # ffprobe reads stream metadata without decoding any frames; OpenCV
+        # is only used when ffprobe isn't installed
+        start_time = time.time()
+        stream = self.ffprobe_stream(rtsp_url)
+        if stream is None:
+            stream = self.opencv_probe_stream(rtsp_url)
+        elapsed = time.time() - start_time
+
+        if not stream['ok']:
+            lines.append(f"  {Colors.RED}❌ Connection failed ({stream['error']}){Colors.RESET}")
+            return False, lines
+
+        lines.append(f"  {Colors.GREEN}✅ Connection successful ({elapsed:.1f}s){Colors.RESET}")
+        lines.append(f"  {Colors.GREEN}✅ Video stream detected ({stream['width']}x{stream['height']}){Colors.RESET}")
+        lines.append(f"  {Colors.GREEN}✅ FPS: {stream['fps']:.1f}{Colors.RESET}")
+        lines.append(f"  {Colors.GREEN}✅ Status: READY{Colors.RESET}")
+        return True, lines
+
+    def rtsp_auth_probe(self, ip: str, port: int, stream_path: str,
+                        username: str, password: str) -> str:
+        """
+        Send an RTSP DESCRIBE (answering a Digest/Basic challenge) over a raw socket
+
+        Returns:
+            'ok', 'unauthorized', 'unreachable', or 'unknown' if the reply
+            can't be interpreted (callers should fall through to a full probe)
+        """
+        uri = f"rtsp://{ip}:{port}{stream_path}"
+        timeout = CAMERA_OPEN_TIMEOUT_MS / 1000
+
         try:
-            import cv2
+            sock = socket.create_connection((ip, port), timeout=timeout)
+        except OSError:
+            return 'unreachable'
 
-            # Build RTSP URL
-            ip = camera.get('ip', '')
-            port = camera.get('port', 554)
-            username = camera.get('username', 'admin')
-            password = camera.get('password', '123456')
-            stream_path = camera.get('stream_path', '/media/video1')
+        # Past this point the port answered, so any socket error (slow reply,
+        # reset after the 401) is inconclusive rather than a dead camera
+        try:
+            with sock:
+                status, challenges = self._rtsp_describe(sock, uri, 1)
+            if status == 401:
+                authorization = self._rtsp_authorization(challenges, uri, username, password)
+                if authorization is None:
+                    return 'unknown'
+                # Many cameras close the connection after a 401, so the
+                # authenticated DESCRIBE goes out on a fresh one
+                with socket.create_connection((ip, port), timeout=timeout) as sock:
+                    status, _ = self._rtsp_describe(sock, uri, 2, authorization)
+        except OSError:
+            return 'unknown'
+
+        if status == 200:
+            return 'ok'
+        if status == 401:
+            return 'unauthorized'
+        return 'unknown'
+
+    def _rtsp_describe(self, sock: socket.socket, uri: str, cseq: int,
+                       authorization: Optional[str] = None) -> Tuple[int, List[str]]:
+        """Send one DESCRIBE and return (status code, WWW-Authenticate challenges)"""
+        request = f"DESCRIBE {uri} RTSP/1.0\r\nCSeq: {cseq}\r\nAccept: application/sdp\r\n"
+        if authorization:
+            request += f"Authorization: {authorization}\r\n"
+        sock.sendall((request + "\r\n").encode())
+
+        data = b""
+        while b"\r\n\r\n" not in data:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            data += chunk
+
+        head, _, body = data.partition(b"\r\n\r\n")
+        lines = head.decode('latin-1').split('\r\n')
+        parts = lines[0].split()
+        status = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+
+        challenges = []
+        content_length = 0
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            name = name.strip().lower()
+            if name == 'www-authenticate':
+                challenges.append(value.strip())
+            elif name == 'content-length' and value.strip().isdigit():
+                content_length = int(value.strip())
+
+        # Read the whole reply so the server sees a clean close
+        while len(body) < content_length:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            body += chunk
+
+        return status, challenges
+
+    def _rtsp_authorization(self, challenges: List[str], uri: str,
+                            username: str, password: str) -> Optional[str]:
+        """Build an Authorization header for a Digest (preferred) or Basic challenge"""
+        for challenge in challenges:
+            scheme, _, params = challenge.partition(' ')
+            if scheme.lower() != 'digest':
+                continue
+            fields = dict(re.findall(r'(\w+)="?([^",]*)"?', params))
+            if 'qop' in fields:
+                return None  # Not used by our cameras; let the full probe decide
+
+            def md5(text: str) -> str:
+                return hashlib.md5(text.encode()).hexdigest()
+
+            realm = fields.get('realm', '')
+            nonce = fields.get('nonce', '')
+            response = md5(f"{md5(f'{username}:{realm}:{password}')}:{nonce}:{md5(f'DESCRIBE:{uri}')}")
+            return (f'Digest username="{username}", realm="{realm}", nonce="{nonce}", '
+                    f'uri="{uri}", response="{response}"')
+
+        for challenge in challenges:
+            if challenge.lower().startswith('basic'):
+                token = base64.b64encode(f"{username}:{password}".encode()).decode()
+                return f"Basic {token}"
 
-            rtsp_url = f"rtsp://{username}:{password}@{ip}:{port}{stream_path}"
+        return None
+
+    def ffprobe_stream(self, rtsp_url: str) -> Optional[Dict]:
+        """
+        Read video stream metadata with ffprobe (no frame decoding)
+
+        Returns:
+            Dict with ok/width/height/fps/error, or None if ffprobe is not installed
+        """
+        cmd = [
+            'ffprobe', '-v', 'error',
+            '-rtsp_transport', 'tcp',
+            '-stimeout', str(CAMERA_OPEN_TIMEOUT_MS * 1000),  # microseconds
+            '-select_streams', 'v:0',
+            '-show_entries', 'stream=width,height,r_frame_rate',
+            '-of', 'json',
+            rtsp_url
+        ]
 
-            if verbose:
-                print(f"  ⏳ Connecting to rtsp://{username}:***@{ip}:{port}{stream_path}")
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True,
+                                    timeout=CAMERA_OPEN_TIMEOUT_MS / 1000 + 2)
+        except FileNotFoundError:
+            return None
+        except subprocess.TimeoutExpired:
+            return {'ok': False, 'error': 'timeout'}
+
+        streams = []
+        if result.returncode == 0:
+            try:
+                streams = json.loads(result.stdout).get('streams', [])
+            except json.JSONDecodeError:
+                pass
+
+        if not streams:
+            error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'no video stream'
+            return {'ok': False, 'error': error}
+
+        stream = streams[0]
+        num, _, den = stream.get('r_frame_rate', '0/1').partition('/')
+        fps = float(num) / float(den) if den and float(den) else 0.0
+
+        return {
+            'ok': True,
+            'width': stream.get('width', 0),
+            'height': stream.get('height', 0),
+            'fps': fps
+        }
+
+    def opencv_probe_stream(self, rtsp_url: str) -> Dict:
+        """Open the stream with OpenCV and decode one frame (ffprobe fallback)"""
+        try:
+            import cv2
 
-            # Try to open stream
-            start_time = time.time()
-            cap = cv2.VideoCapture(rtsp_url)
+            # Timeouts are enforced inside FFmpeg, so a dead camera fails fast
+            cap = cv2.VideoCapture(rtsp_url, cv2.CAP_FFMPEG, [
+                cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, CAMERA_OPEN_TIMEOUT_MS,
+                cv2.CAP_PROP_READ_TIMEOUT_MSEC, CAMERA_READ_TIMEOUT_MS
+            ])
 
             if not cap.isOpened():
-                if verbose:
-                    print(f"  {Colors.RED}❌ Connection failed (could not open stream){Colors.RESET}")
                 cap.release()
-                return False
+                return {'ok': False, 'error': 'could not open stream'}
 
-            # Try to read a frame
             ret, frame = cap.read()
-            elapsed = time.time() - start_time
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            cap.release()
 
-            if ret and frame is not None:
-                height, width = frame.shape[:2]
-                fps = cap.get(cv2.CAP_PROP_FPS)
+            if not ret or frame is None:
+                return {'ok': False, 'error': 'no frames received'}
 
-                if verbose:
-                    print(f"  {Colors.GREEN}✅ Connection successful ({elapsed:.1f}s){Colors.RESET}")
-                    print(f"  {Colors.GREEN}✅ Video stream detected ({width}x{height}){Colors.RESET}")
-                    print(f"  {Colors.GREEN}✅ FPS: {fps:.1f}{Colors.RESET}")
-                    print(f"  {Colors.GREEN}✅ Status: READY{Colors.RESET}")
-
-                cap.release()
-                return True
-            else:
-                if verbose:
-                    print(f"  {Colors.RED}❌ Connection failed (no frames received){Colors.RESET}")
-                cap.release()
-                return False
+            height, width = frame.shape[:2]
+            return {'ok': True, 'width': width, 'height': height, 'fps': fps}
 
         except Exception as e:
-            if verbose:
-                print(f"  {Colors.RED}❌ Connection failed: {e}{Colors.RESET}")
-            return False
+            return {'ok': False, 'error': str(e)}
 
     def handle_camera_failures(self, failed_cameras: List[Dict]) -> bool:
         """Handle failed camera connections interactively"""
@@ -5,13 +5,31 @@ Created: 2025-11-20
 Purpose: Perform 9-level diagnostic analysis of surveillance infrastructure
 """
 
+import io
 import os
+import sys
 import json
 import subprocess
 from datetime import datetime, timedelta
 from pathlib import Path
 import sqlite3
 
+# Report symbol for each level status
+STATUS_SYMBOLS = {"HEALTHY": "✓", "WARNING": "⚠", "CRITICAL": "✗", "ERROR": "✗", "IDLE": "○"}
+
+def count_files(root, suffix):
+    """Count files ending in suffix under root (os.scandir walk, no Path per entry)"""
+    count = 0
+    stack = [str(root)]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(suffix):
+                    count += 1
+    return count
+
 class SurveillanceHealthChecker:
     def __init__(self):
         self.base_dir = Path("/home/smartahc/smartice/ASEOfSmartICE/production/RTX_3060")
@@ -363,8 +381,7 @@ class SurveillanceHealthChecker:
             # Check results directory
             results_dir = self.base_dir / "results"
             if results_dir.exists():
-                result_files = list(results_dir.rglob("*.mp4"))
-                results_count = len(result_files)
+                results_count = count_files(results_dir, ".mp4")
             else:
                 results_count = 0
 
@@ -546,50 +563,56 @@ class SurveillanceHealthChecker:
 
     def print_report(self):
         """Print formatted health report"""
-        print("\n" + "=" * 80)
-        print("EXECUTIVE SUMMARY")
-        print("=" * 80)
-        print(f"Overall Status: {self.report['overall_status']}")
-        print(f"Timestamp: {self.report['timestamp']}")
-        print()
+        # Build the report in memory and emit it with a single write
+        buf = io.StringIO()
 
-        print("=" * 80)
-        print("LEVEL-BY-LEVEL ASSESSMENT")
-        print("=" * 80)
+        print("\n" + "=" * 80, file=buf)
+        print("EXECUTIVE SUMMARY", file=buf)
+        print("=" * 80, file=buf)
+        print(f"Overall Status: {self.report['overall_status']}", file=buf)
+        print(f"Timestamp: {self.report['timestamp']}", file=buf)
+        print(file=buf)
+
+        print("=" * 80, file=buf)
+        print("LEVEL-BY-LEVEL ASSESSMENT", file=buf)
+        print("=" * 80, file=buf)
 
         for level_name, level_data in self.report["levels"].items():
             status = level_data.get("status", "UNKNOWN")
-            symbol = {"HEALTHY": "✓", "WARNING": "⚠", "CRITICAL": "✗", "ERROR": "✗", "IDLE": "○"}.get(status, "?")
+            symbol = STATUS_SYMBOLS.get(status, "?")
 
-            print(f"\n{symbol} {level_name.replace('_', ' ').title()}: {status}")
+            print(f"\n{symbol} {level_name.replace('_', ' ').title()}: {status}", file=buf)
             for key, value in level_data.items():
                 if key != "status":
-                    print(f"  - {key}: {value}")
+                    print(f"  - {key}: {value}", file=buf)
 
         if self.report["critical_issues"]:
-            print("\n" + "=" * 80)
-            print("CRITICAL ISSUES")
-            print("=" * 80)
+            print("\n" + "=" * 80, file=buf)
+            print("CRITICAL ISSUES", file=buf)
+            print("=" * 80, file=buf)
             for issue in self.report["critical_issues"]:
-                print(f"✗ {issue}")
+                print(f"✗ {issue}", file=buf)
 
         if self.report["warnings"]:
-            print("\n" + "=" * 80)
-            print("WARNINGS")
-            print("=" * 80)
+            print("\n" + "=" * 80, file=buf)
+            print("WARNINGS", file=buf)
+            print("=" * 80, file=buf)
             for warning in self.report["warnings"]:
-                print(f"⚠ {warning}")
+                print(f"⚠ {warning}", file=buf)
 
         if self.report["recommendations"]:
-            print("\n" + "=" * 80)
-            print("RECOMMENDATIONS")
-            print("=" * 80)
+            print("\n" + "=" * 80, file=buf)
+            print("RECOMMENDATIONS", file=buf)
+            print("=" * 80, file=buf)
             for i, rec in enumerate(self.report["recommendations"], 1):
-                print(f"{i}. {rec}")
+                print(f"{i}. {rec}", file=buf)
 
-        print("\n" + "=" * 80)
-        print("END OF HEALTH REPORT")
-        print("=" * 80)
+        print("\n" + "=" * 80, file=buf)
+        print("END OF HEALTH REPORT", file=buf)
+        print("=" * 80, file=buf)
+
+        sys.stdout.write(buf.getvalue())
+        sys.stdout.flush()
 
 if __name__ == "__main__":
     checker = SurveillanceHealthChecker()
@@ -10,10 +10,12 @@ Usage:
   python3 monitor_gpu.py              # One-time check
   python3 monitor_gpu.py --watch 30   # Watch every 30 seconds
   python3 monitor_gpu.py --alert 80   # Alert if temp > 80°C
+  python3 monitor_gpu.py --json       # One-time check, stats as JSON (for the service)
 """
 
 import subprocess
 import sys
+import json
 import time
 import argparse
 from datetime import datetime
@@ -58,7 +60,7 @@ def get_gpu_stats():
                 'name': name
             }
     except Exception as e:
-        print(f"Error querying GPU: {e}")
+        print(f"Error querying GPU: {e}", file=sys.stderr)  # Keep --json stdout parseable
 
     return None
 
@@ -98,6 +100,8 @@ def main():
                        help="Watch mode: update every N seconds")
     parser.add_argument("--alert", type=int, default=80,
                        help="Temperature alert threshold (default: 80°C)")
+    parser.add_argument("--json", action="store_true",
+                       help="Print stats as a single JSON object (null if no GPU)")
 
     args = parser.parse_args()
 
@@ -111,6 +115,12 @@ def main():
         except KeyboardInterrupt:
             print("\n\nStopped monitoring")
             sys.exit(0)
+    elif args.json:
+        stats = get_gpu_stats()
+        print(json.dumps(stats))
+        if stats is None:
+            sys.exit(2)
+        sys.exit(1 if stats['temperature'] >= args.alert else 0)
     else:
         stats = get_gpu_stats()
         exit_code = print_gpu_status(stats, args.alert)
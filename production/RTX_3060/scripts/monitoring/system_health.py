@@ -19,28 +19,38 @@ Usage:
   python3 system_health.py --quick   # Skip slow checks
 """
 
+import io
 import sys
+import importlib.util
+from contextlib import redirect_stdout
 from pathlib import Path
-import subprocess
 
 SCRIPT_DIR = Path(__file__).parent.resolve()
 PROJECT_DIR = SCRIPT_DIR.parent.parent
 
+def load_sibling_script(name):
+    """Import a monitoring script by path (bytecode is cached in __pycache__)"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, SCRIPT_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    sys.modules[name] = module
+    return module
+
 def check_disk_space():
     """Check disk space using check_disk_space.py"""
-    result = subprocess.run(
-        [sys.executable, SCRIPT_DIR / "check_disk_space.py", "--check"],
-        capture_output=True
-    )
-    return result.returncode == 0
+    disk = load_sibling_script("check_disk_space")
+    with redirect_stdout(io.StringIO()):
+        exit_code = disk.check_and_cleanup(min_space_gb=disk.MIN_SPACE_GB)
+    return exit_code == 0
 
 def check_gpu():
     """Check GPU using monitor_gpu.py"""
-    result = subprocess.run(
-        [sys.executable, SCRIPT_DIR / "monitor_gpu.py"],
-        capture_output=True
-    )
-    return result.returncode in [0, 2]  # 0=healthy, 2=no GPU (ok on Mac)
+    gpu = load_sibling_script("monitor_gpu")
+    with redirect_stdout(io.StringIO()):
+        exit_code = gpu.print_gpu_status(gpu.get_gpu_stats())
+    return exit_code in [0, 2]  # 0=healthy, 2=no GPU (ok on Mac)
 
 def check_directories():
     """Check required directories exist"""
@@ -3,6 +3,11 @@
 ASE Restaurant Surveillance Service - Automated Daemon
 Version: 2.4.0
 Created: 2025-11-16
+Modified: 2026-10-17 - Drain capture/processing child output in background threads
+  - stdout/stderr pipes were never read, so a chatty child could block on a full pipe
+  - Only the last OUTPUT_TAIL_LINES lines per stream are kept for error reporting
+  - A child that exits with an error gets its last EXIT_LOG_TAIL_LINES stderr lines logged
+
 Modified: 2025-11-22 - v2.3.0: CRITICAL FIX - Increased SIGTERM timeout for video finalization
   - Increased timeout from 10s to 30s to allow FFmpeg to properly close MP4 files
   - Prevents "moov atom not found" corruption when capture ends
@@ -68,6 +73,7 @@ import time
 import signal
 import threading
 import subprocess
+from collections import deque
 from pathlib import Path
 from datetime import datetime, time as dt_time
 from typing import Optional
@@ -121,6 +127,11 @@ GPU_CHECK_INTERVAL = _config["monitoring_intervals"]["gpu_check_seconds"]
 DB_SYNC_INTERVAL = _config["monitoring_intervals"]["db_sync_seconds"]
 HEALTH_CHECK_INTERVAL = _config["monitoring_intervals"]["health_check_seconds"]
 
+# Lines of child process output kept per stream (tail only, for error reporting)
+OUTPUT_TAIL_LINES = 1000
+# Stderr lines logged when a capture/processing child exits with a non-zero code
+EXIT_LOG_TAIL_LINES = 50
+
 
 class SurveillanceService:
     """
@@ -134,6 +145,7 @@ class SurveillanceService:
         self.capture_process = None
         self.processing_process = None
         self.current_capture_window = None  # Track which window is currently active
+        self.process_output = {}  # Process name -> {"stdout": deque, "stderr": deque, "readers": [Thread]}
 
         # Thread locks to prevent race conditions
         self.capture_lock = threading.Lock()
@@ -229,6 +241,7 @@ class SurveillanceService:
 
         pid = self.capture_process.pid
         self.logger.info(f"Stopping {process_name} capture process (PID: {pid})...")
+        self.process_output.pop("capture", None)  # Exit code from our SIGTERM/SIGKILL is expected
 
         # Step 1: Send SIGTERM (graceful shutdown)
         try:
@@ -272,6 +285,56 @@ class SurveillanceService:
             self.logger.error(f"  ❌ Error force killing PID {pid}: {e}")
             return False
 
+    def _drain_output(self, process, name):
+        """
+        Read a child's stdout/stderr in background threads so its pipes never fill up.
+        Only the last OUTPUT_TAIL_LINES lines of each stream are kept.
+        """
+        tails = {
+            "stdout": deque(maxlen=OUTPUT_TAIL_LINES),
+            "stderr": deque(maxlen=OUTPUT_TAIL_LINES),
+            "readers": []
+        }
+        self.process_output[name] = tails
+
+        def reader(stream, tail):
+            try:
+                with stream:
+                    for line in stream:
+                        tail.append(line.rstrip("\n"))
+            except Exception as e:
+                # The child blocks once its pipe fills, so a dead reader has to be visible
+                self.logger.error(f"❌ Output reader for {name} stopped: {e}")
+
+        for stream_name, stream in (("stdout", process.stdout), ("stderr", process.stderr)):
+            thread = threading.Thread(
+                target=reader,
+                args=(stream, tails[stream_name]),
+                name=f"{name}-{stream_name}",
+                daemon=True
+            )
+            thread.start()
+            tails["readers"].append(thread)
+
+    def _report_exited_children(self):
+        """
+        Log the stderr tail of a capture/processing child that exited with an error.
+        Each child is reported once; its output tails are dropped afterwards.
+        """
+        for name, process in (("capture", self.capture_process), ("processing", self.processing_process)):
+            if process is None or name not in self.process_output or process.poll() is None:
+                continue
+
+            tails = self.process_output.pop(name, None)  # Health check and scheduler both report
+            if tails is None or process.returncode == 0:
+                continue
+
+            for thread in tails["readers"]:
+                thread.join(timeout=1)  # Let the readers pick up the last lines
+            self.logger.error(f"❌ {name} process (PID {process.pid}) exited with code {process.returncode}")
+            for line in list(tails["stderr"])[-EXIT_LOG_TAIL_LINES:]:
+                self.logger.error(f"   [{name}] {line}")
+
     def _cleanup_zombies(self):
         """
         Clean up zombie (defunct) child processes.
@@ -291,6 +354,10 @@ class SurveillanceService:
                     # No more zombies to reap
                     break
                 cleaned += 1
+                # Our own children are normally reaped by poll(); keep their exit code if not
+                for process in (self.capture_process, self.processing_process):
+                    if process is not None and process.pid == pid:
+                        process.returncode = os.waitstatus_to_exitcode(status)
                 # Log the cleanup
                 exit_code = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -1
                 self.logger.debug(f"🧹 Reaped zombie process PID {pid} (exit code: {exit_code})")
@@ -343,8 +410,12 @@ class SurveillanceService:
                 self.capture_process = subprocess.Popen(
                     ["python3", str(capture_script), "--duration", str(duration)],
                     stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE
+                    stderr=subprocess.PIPE,
+                    text=True,
+                    errors="replace",  # Stray bytes in FFmpeg/OpenCV output must not kill the drain
+                    bufsize=1
                 )
+                self._drain_output(self.capture_process, "capture")
                 self.current_capture_window = window  # Track active window
                 self.logger.info(f"Video capture started (PID: {self.capture_process.pid}, {window_name} window)")
                 self.logger.info(f"  Window: {window['start_hour']:02d}:{window['start_minute']:02d} - {window['end_hour']:02d}:{window['end_minute']:02d}")
@@ -377,8 +448,12 @@ class SurveillanceService:
                 self.processing_process = subprocess.Popen(
                     ["python3", str(orchestrator_script)],
                     stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE
+                    stderr=subprocess.PIPE,
+                    text=True,
+                    errors="replace",  # Stray bytes in FFmpeg/OpenCV output must not kill the drain
+                    bufsize=1
                 )
+                self._drain_output(self.processing_process, "processing")
                 self.logger.info(f"Video processing started (PID: {self.processing_process.pid})")
             except Exception as e:
                 self.logger.error(f"Failed to start video processing: {e}")
@@ -417,17 +492,18 @@ class SurveillanceService:
                 gpu_script = PROJECT_ROOT / "scripts" / "monitoring" / "monitor_gpu.py"
 
                 result = subprocess.run(
-                    ["python3", str(gpu_script)],
-                    capture_output=True,
+                    ["python3", str(gpu_script), "--json"],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
                     text=True,
                     timeout=30
                 )
 
-                # Parse GPU temperature from output
-                if "Temperature:" in result.stdout:
-                    temp_line = [line for line in result.stdout.split('\n') if 'Temperature:' in line]
-                    if temp_line:
-                        self.logger.debug(f"GPU: {temp_line[0].strip()}")
+                # Stats come back as one JSON object (null if no GPU)
+                stats = json.loads(result.stdout) if result.stdout.strip() else None
+                if stats:
+                    self.logger.debug(f"GPU: {stats['temperature']}°C, {stats['utilization']}% util, "
+                                      f"{stats['memory_used']}/{stats['memory_total']}MB")
 
             except Exception as e:
                 self.logger.error(f"GPU check failed: {e}")
@@ -470,6 +546,7 @@ class SurveillanceService:
                 }
 
                 self.logger.info(f"Health check: {status}")
+                self._report_exited_children()  # Before a restart replaces the output tails
 
                 # Restart capture if it should be running but isn't
                 in_window, window = self.is_in_capture_window()
@@ -496,6 +573,7 @@ class SurveillanceService:
         while self.running:
             try:
                 # Cleanup any zombie processes (Modified: 2025-12-12)
+                self._report_exited_children()
                 self._cleanup_zombies()
 
                 now = datetime.now()
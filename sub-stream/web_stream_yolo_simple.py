@@ -341,16 +341,17 @@ def main():
     print("🔧 Processing: Every 3rd frame")
     print("-" * 60)
     
+    # Start capture thread first so the RTSP handshake overlaps the model load;
+    # frames are streamed without detection until the model is ready
+    capture_thread = threading.Thread(target=capture_and_detect)
+    capture_thread.daemon = True
+    capture_thread.start()
+    
     # Load YOLO model
     if not load_yolo_model():
         print("❌ Failed to load YOLO model")
         return
     
-    # Start capture thread
-    capture_thread = threading.Thread(target=capture_and_detect)
-    capture_thread.daemon = True
-    capture_thread.start()
-    
     # Wait for connection
     print("⏳ Waiting for camera connection...")
     time.sleep(3)
@@ -521,6 +521,9 @@ def batch_inference_worker():
 
     batch_count = 0
 
+    # Bind the clock once; monotonic is also immune to NTP jumps
+    _now = time.monotonic
+
     while inference_running:
         batch_requests = []
         batch_frames = []
@@ -528,9 +531,9 @@ def batch_inference_worker():
         # Collect batch (wait for first frame, then quickly collect more)
         try:
             # Wait for first request (blocking)
-            wait_start = time.time()
+            wait_start = _now()
             first_request = inference_queue.get(timeout=1.0)
-            wait_time = (time.time() - wait_start) * 1000
+            wait_time = (_now() - wait_start) * 1000
 
             batch_requests.append(first_request)
             batch_frames.append(first_request.frame)
@@ -540,8 +543,9 @@ def batch_inference_worker():
             # With 15 cameras @ 3 FPS: frames arrive every ~22ms
             # With 30 cameras @ 3 FPS: frames arrive every ~11ms
             # Use 20ms timeout to collect 1-2 more frames
-            collect_start = time.time()
-            while len(batch_frames) < batch_size and (time.time() - collect_start) < 0.02:  # 20ms timeout
+            collect_start = _now()
+            collect_deadline = collect_start + 0.02  # 20ms timeout
+            while len(batch_frames) < batch_size and _now() < collect_deadline:
                 try:
                     request = inference_queue.get(timeout=0.005)  # 5ms wait
                     batch_requests.append(request)
@@ -549,7 +553,7 @@ def batch_inference_worker():
                 except:
                     break  # Timeout, no more frames available
 
-            collect_time = (time.time() - collect_start) * 1000
+            collect_time = (_now() - collect_start) * 1000
             logger.info(f"[{worker_id}] Collected {len(batch_frames)} frames in {collect_time:.1f}ms")
 
         except:
@@ -560,9 +564,9 @@ def batch_inference_worker():
 
         # Batch inference
         try:
-            infer_start = time.time()
+            infer_start = _now()
             results = shared_model(batch_frames, conf=CONF_THRESHOLD, iou=IOU_THRESHOLD, verbose=False)
-            infer_time = (time.time() - infer_start) * 1000
+            infer_time = (_now() - infer_start) * 1000
 
             batch_count += 1
             per_frame_time = infer_time / len(batch_frames)
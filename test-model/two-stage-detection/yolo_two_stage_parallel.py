@@ -15,28 +15,27 @@ Performance Notes:
 
 import cv2
 import numpy as np
-from ultralytics import YOLO
 import os
 from pathlib import Path
 import argparse
 import time
 import torch
-
-# Model paths and configuration
-PERSON_DETECTOR_MODEL = "models/yolov8n.pt"  # Standard COCO-trained YOLO
-STAFF_CLASSIFIER_MODEL = "../../train-model/models/waiter_customer_model/weights/best.pt"
-
-# Detection parameters
+import torch.nn.functional as F
+from torchvision.io import ImageReadMode, decode_jpeg, read_file
+
+# Model paths, engine settings and drawing helpers are shared with the
+# sequential script so changes only need to land in one place
+from yolo_two_stage_sequential import (
+    PERSON_DETECTOR_MODEL, STAFF_CLASSIFIER_MODEL, MIN_PERSON_SIZE,
+    ENGINE_IMGSZ, ENGINE_MAX_BATCH, STAFF_CLASSIFIER_INT8, STAFF_CALIBRATION_DATA,
+    STAFF_CLASSIFIER_STATIC_BATCH, CLASS_NAMES,
+    load_optimized_model, classify_crop_batch, draw_detections
+)
+
+# Detection parameters (overridable from the command line)
 PERSON_CONF_THRESHOLD = 0.3    # Lower threshold to catch all people
 STAFF_CONF_THRESHOLD = 0.5     # Higher threshold for reliable classification
-MIN_PERSON_SIZE = 50           # Minimum person width/height in pixels
-
-# Visual configuration
-COLORS = {
-    'waiter': (0, 255, 0),      # Green for waiters
-    'customer': (0, 0, 255)     # Red for customers
-}
-CLASS_NAMES = ['waiter', 'customer']
+VERBOSE = False                # Print YOLO's per-image banner (--verbose)
 
 def check_gpu():
     """Check if GPU is available and return device"""
@@ -58,9 +57,7 @@ def load_models(device='cpu'):
 
     # Load person detector (standard YOLO)
     print(f"   Loading person detector: {PERSON_DETECTOR_MODEL}")
-    person_detector = YOLO(PERSON_DETECTOR_MODEL)
-    if device == 'cuda':
-        person_detector.to('cuda')
+    person_detector = load_optimized_model(PERSON_DETECTOR_MODEL, device)
 
     # Load staff classifier (our trained model)
     if not os.path.exists(STAFF_CLASSIFIER_MODEL):
@@ -68,14 +65,63 @@ def load_models(device='cpu'):
         return None, None
 
     print(f"   Loading staff classifier: {STAFF_CLASSIFIER_MODEL}")
-    staff_classifier = YOLO(STAFF_CLASSIFIER_MODEL)
-    if device == 'cuda':
-        staff_classifier.to('cuda')
+    staff_classifier = load_optimized_model(
+        STAFF_CLASSIFIER_MODEL, device,
+        int8_data=STAFF_CALIBRATION_DATA if STAFF_CLASSIFIER_INT8 else None,
+        static_batch=ENGINE_MAX_BATCH if STAFF_CLASSIFIER_STATIC_BATCH else None
+    )
 
     print("✅ Both models loaded successfully!")
     return person_detector, staff_classifier
 
-def detect_persons_batch(person_detector, image, device='cpu'):
+def load_image(image_path, device='cpu'):
+    """
+    Load an image, decoding JPEGs straight onto the GPU (nvJPEG) when on CUDA
+
+    Args:
+        image_path: Path to input image
+        device: Device to run on ('cpu' or 'cuda')
+
+    Returns:
+        tuple: (BGR numpy image for drawing/saving or None,
+                CHW RGB uint8 CUDA tensor or None on CPU)
+    """
+    if device == 'cuda' and Path(image_path).suffix.lower() in ('.jpg', '.jpeg'):
+        try:
+            gpu_image = decode_jpeg(read_file(image_path), mode=ImageReadMode.RGB, device='cuda')
+            image = gpu_image.permute(1, 2, 0).flip(-1).contiguous().cpu().numpy()
+            return image, gpu_image
+        except Exception as e:
+            print(f"⚠️  GPU JPEG decode failed, using OpenCV: {e}")
+
+    image = cv2.imread(image_path)
+    if image is None or device != 'cuda':
+        return image, None
+
+    gpu_image = torch.from_numpy(image).to('cuda').permute(2, 0, 1).flip(0)
+    return image, gpu_image
+
+def letterbox_on_gpu(chw_image, size=ENGINE_IMGSZ):
+    """
+    Resize (keeping aspect ratio) and pad a CHW uint8 CUDA image to size x size
+
+    Returns:
+        tuple: (3 x size x size float tensor in [0, 1], scale, top pad, left pad)
+    """
+    h, w = chw_image.shape[1:]
+    scale = min(size / h, size / w)
+    new_h, new_w = max(1, round(h * scale)), max(1, round(w * scale))
+    top, left = (size - new_h) // 2, (size - new_w) // 2
+
+    padded = torch.full((3, size, size), 114 / 255, device=chw_image.device)
+    padded[:, top:top + new_h, left:left + new_w] = F.interpolate(
+        chw_image.unsqueeze(0).float().div_(255), size=(new_h, new_w),
+        mode='bilinear', align_corners=False
+    )[0]
+
+    return padded, scale, top, left
+
+def detect_persons_batch(person_detector, image, device='cpu', gpu_image=None):
     """
     Stage 1: Detect all persons in the image using standard YOLO
 
@@ -83,6 +129,8 @@ def detect_persons_batch(person_detector, image, device='cpu'):
         person_detector: YOLO model for person detection
         image: Input image
         device: Device to run on ('cpu' or 'cuda')
+        gpu_image: Optional CHW RGB uint8 CUDA copy of the image; when given
+                   the frame is letterboxed on-device instead of on the CPU
 
     Returns:
         list: Person detection results with bounding boxes
@@ -91,32 +139,61 @@ def detect_persons_batch(person_detector, image, device='cpu'):
 
     # Run person detection (class 0 = person in COCO dataset)
     stage1_start = time.time()
-    results = person_detector(image, conf=PERSON_CONF_THRESHOLD, classes=[0], device=device, verbose=True)
+    if gpu_image is not None:
+        source, scale, top, left = letterbox_on_gpu(gpu_image)
+        results = person_detector(source.unsqueeze(0), conf=PERSON_CONF_THRESHOLD, classes=[0],
+                                  device=device, verbose=VERBOSE)
+    else:
+        results = person_detector(image, conf=PERSON_CONF_THRESHOLD, classes=[0], device=device, verbose=VERBOSE)
     stage1_time = (time.time() - stage1_start) * 1000
 
+    # Copy all boxes to the host in one transfer instead of one sync per box
     person_detections = []
-    for result in results:
-        boxes = result.boxes
-        if boxes is not None:
-            for box in boxes:
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                confidence = box.conf[0].cpu().numpy()
-
-                # Filter by minimum size
-                width = x2 - x1
-                height = y2 - y1
-                if width >= MIN_PERSON_SIZE and height >= MIN_PERSON_SIZE:
-                    person_detections.append({
-                        'bbox': (int(x1), int(y1), int(x2), int(y2)),
-                        'confidence': confidence
-                    })
+    boxes = results[0].boxes
+    if boxes is not None and len(boxes) > 0:
+        xyxy = boxes.xyxy
+        if gpu_image is not None:
+            # Map boxes from the letterboxed input back to original image coordinates
+            xyxy = (xyxy - xyxy.new_tensor([left, top, left, top])) / scale
+            xyxy[:, 0::2] = xyxy[:, 0::2].clamp(0, image.shape[1])
+            xyxy[:, 1::2] = xyxy[:, 1::2].clamp(0, image.shape[0])
+        xyxy = xyxy.cpu().numpy().astype(int)
+        confidences = boxes.conf.cpu().numpy()
+
+        # Filter by minimum size
+        widths = xyxy[:, 2] - xyxy[:, 0]
+        heights = xyxy[:, 3] - xyxy[:, 1]
+        keep = (widths >= MIN_PERSON_SIZE) & (heights >= MIN_PERSON_SIZE)
+
+        for (x1, y1, x2, y2), confidence in zip(xyxy[keep], confidences[keep]):
+            person_detections.append({
+                'bbox': (int(x1), int(y1), int(x2), int(y2)),
+                'confidence': float(confidence)
+            })
 
     print(f"   Found {len(person_detections)} persons")
     print(f"   Stage 1 time: {stage1_time:.1f}ms")
 
     return person_detections, stage1_time
 
-def classify_persons_batch(staff_classifier, image, person_detections, device='cpu'):
+def letterbox_crops_on_gpu(gpu_image, bboxes, size=ENGINE_IMGSZ):
+    """
+    Build a letterboxed (N,3,size,size) crop batch from the GPU copy of the frame
+
+    Args:
+        gpu_image: CHW RGB uint8 CUDA image
+        bboxes: List of (x1, y1, x2, y2) person boxes
+        size: Square model input size
+
+    Returns:
+        torch.Tensor: RGB float batch in [0, 1] ready for the staff classifier
+    """
+    return torch.stack([
+        letterbox_on_gpu(gpu_image[:, y1:y2, x1:x2], size)[0]
+        for x1, y1, x2, y2 in bboxes
+    ])
+
+def classify_persons_batch(staff_classifier, image, person_detections, device='cpu', gpu_image=None):
     """
     Stage 2: Classify all detected persons as waiter or customer using batch processing
 
@@ -125,6 +202,7 @@ def classify_persons_batch(staff_classifier, image, person_detections, device='c
         image: Original image
         person_detections: List of person bounding boxes from stage 1
         device: Device to run on ('cpu' or 'cuda')
+        gpu_image: CHW RGB uint8 CUDA copy of the image (required on CUDA)
 
     Returns:
         list: Classification results for each person
@@ -152,8 +230,13 @@ def classify_persons_batch(staff_classifier, image, person_detections, device='c
     print(f"   Processing {len(person_crops)} person crops in batch...")
     stage2_start = time.time()
 
-    # YOLO can accept a list of images for batch processing
-    batch_results = staff_classifier(person_crops, conf=STAFF_CONF_THRESHOLD, device=device, verbose=False)
+    # YOLO can accept a list of images for batch processing. On GPU, crops are
+    # cut from the device copy of the frame and letterboxed on-device
+    if device == 'cuda':
+        crop_batch = letterbox_crops_on_gpu(gpu_image, [person_detections[i]['bbox'] for i in valid_indices])
+        batch_results = classify_crop_batch(staff_classifier, crop_batch, STAFF_CONF_THRESHOLD)
+    else:
+        batch_results = staff_classifier(person_crops, conf=STAFF_CONF_THRESHOLD, device=device, verbose=False)
 
     stage2_time = (time.time() - stage2_start) * 1000
 
@@ -172,10 +255,11 @@ def classify_persons_batch(staff_classifier, image, person_detections, device='c
         }
 
         # Check for classification results
-        if result.boxes is not None and len(result.boxes) > 0:
-            box = result.boxes[0]
-            conf = float(box.conf[0].cpu().numpy())
-            class_id = int(box.cls[0].cpu().numpy())
+        boxes = result.boxes
+        if boxes is not None and len(boxes) > 0:
+            best = int(boxes.conf.argmax())
+            conf = float(boxes.conf[best])
+            class_id = int(boxes.cls[best])
 
             best_classification = {
                 'class': CLASS_NAMES[class_id],
@@ -195,44 +279,6 @@ def classify_persons_batch(staff_classifier, image, person_detections, device='c
 
     return classified_detections, stage2_time
 
-def draw_detections(image, detections):
-    """Draw bounding boxes and labels on the image"""
-    annotated_image = image.copy()
-
-    for detection in detections:
-        x1, y1, x2, y2 = detection['bbox']
-        class_name = detection['class']
-        confidence = detection['confidence']
-
-        # Get color for this class
-        if class_name in COLORS:
-            color = COLORS[class_name]
-        else:
-            color = (128, 128, 128)  # Gray for unknown
-
-        # Draw bounding box
-        cv2.rectangle(annotated_image, (x1, y1), (x2, y2), color, 2)
-
-        # Prepare label
-        if confidence > 0:
-            label = f"{class_name}: {confidence:.1%}"
-        else:
-            label = f"{class_name}"
-
-        # Draw label background
-        label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
-        cv2.rectangle(annotated_image,
-                     (x1, y1 - label_size[1] - 10),
-                     (x1 + label_size[0], y1),
-                     color, -1)
-
-        # Draw label text
-        cv2.putText(annotated_image, label,
-                   (x1, y1 - 5),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-
-    return annotated_image
-
 def print_detection_summary(detections, stage1_time, stage2_time, device):
     """Print summary of detection results with performance metrics"""
     if not detections:
@@ -285,7 +331,8 @@ def analyze_image(image_path, output_dir="results", device='cpu'):
         print(f"❌ Image not found: {image_path}")
         return False
 
-    image = cv2.imread(image_path)
+    # JPEGs are decoded on the GPU when running on CUDA
+    image, gpu_image = load_image(image_path, device)
     if image is None:
         print(f"❌ Could not load image: {image_path}")
         return False
@@ -293,18 +340,18 @@ def analyze_image(image_path, output_dir="results", device='cpu'):
     print(f"📏 Image size: {image.shape[1]}x{image.shape[0]}")
 
     # Stage 1: Detect persons
-    person_detections, stage1_time = detect_persons_batch(person_detector, image, device)
+    person_detections, stage1_time = detect_persons_batch(person_detector, image, device, gpu_image)
     if not person_detections:
         print("❌ No persons detected in image")
         return False
 
     # Stage 2: Classify persons (batch processing)
     classified_detections, stage2_time = classify_persons_batch(
-        staff_classifier, image, person_detections, device
+        staff_classifier, image, person_detections, device, gpu_image
     )
 
-    # Draw results
-    annotated_image = draw_detections(image, classified_detections)
+    # Draw results (the clean frame isn't needed afterwards)
+    annotated_image = draw_detections(image, classified_detections, inplace=True)
 
     # Print summary
     print_detection_summary(classified_detections, stage1_time, stage2_time, device)
@@ -324,6 +371,8 @@ def analyze_image(image_path, output_dir="results", device='cpu'):
 
 def main():
     """Main function with argument parsing"""
+    global PERSON_CONF_THRESHOLD, STAFF_CONF_THRESHOLD, VERBOSE
+
     parser = argparse.ArgumentParser(
         description="Two-stage staff detection with parallel/batch processing"
     )
@@ -335,10 +384,13 @@ def main():
                        help="Person detection confidence threshold")
     parser.add_argument("--staff_conf", type=float, default=STAFF_CONF_THRESHOLD,
                        help="Staff classification confidence threshold")
+    parser.add_argument("--verbose", action="store_true",
+                       help="Print YOLO's per-image inference output (debugging)")
     parser.add_argument("--device", choices=['cpu', 'cuda', 'auto'], default='auto',
                        help="Device to use (cpu/cuda/auto)")
 
     args = parser.parse_args()
+    VERBOSE = args.verbose
 
     # Determine device
     if args.device == 'auto':
@@ -348,10 +400,8 @@ def main():
 
     # Update global thresholds if provided
     if args.person_conf:
-        global PERSON_CONF_THRESHOLD
         PERSON_CONF_THRESHOLD = args.person_conf
     if args.staff_conf:
-        global STAFF_CONF_THRESHOLD
         STAFF_CONF_THRESHOLD = args.staff_conf
 
     # Analyze image
@@ -16,8 +16,24 @@ import hashlib
 from datetime import datetime, timedelta
 from pathlib import Path
 import requests
-from queue import Queue
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from queue import Queue, Empty
+from itertools import groupby
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import shutil
+from array import array
+
+# libjpeg-turbo encoder (pip install PyTurboJPEG); falls back to cv2.imencode
+try:
+    from turbojpeg import TurboJPEG
+    TURBOJPEG_AVAILABLE = True
+except ImportError:
+    TURBOJPEG_AVAILABLE = False
+
+# RTSP over TCP with a small jitter buffer (read by OpenCV's FFmpeg backend,
+# so it must be set before any VideoCapture)
+os.environ.setdefault('OPENCV_FFMPEG_CAPTURE_OPTIONS', 'rtsp_transport;tcp|max_delay;500000')
 
 # Supabase Configuration (Private repo - credentials are safe)
 SUPABASE_URL = "https://wdpeoyugsxqnpwwtkqsl.supabase.co"
@@ -30,7 +46,15 @@ MACHINE_ID = "smartice001"
 # Configuration
 CAPTURE_INTERVAL = 300  # 5 minutes in seconds
 CONNECTION_TIMEOUT = 5  # seconds
+CONNECTION_TEST_BUDGET = 30  # seconds - total for all connection test attempts per camera
 RETRY_ATTEMPTS = 3
+GRAB_INTERVAL = 1.0  # seconds - how often background grabbers convert a frame into their slot
+GRAB_SUBSTREAM = True  # Grabbers read the NVR sub stream (s1) instead of the main stream (s0)
+SNAPSHOT_MAX_AGE = 10  # seconds - older grabbed frames are treated as a dead stream
+RECONNECT_DELAY = 5  # seconds - grabber wait before re-opening a dropped stream
+JPEG_QUALITY = 82
+TARGET_MAX_DIM = 1280  # Longest side of uploaded screenshots; larger frames are downscaled
+ENCODE_WORKERS = 2  # Threads doing resize + JPEG encode (CPU bound, kept off the capture/upload workers)
 # Camera config options - SmartICE (30 cameras via NVR) or legacy Ye Bai Ling
 CAMERA_CONFIG_FILE = "../../unv-camera-detection/smartice_cameras_config.json"
 # CAMERA_CONFIG_FILE = "../../test/camera_connection_results_20250927_230846.json"  # Legacy config
@@ -42,60 +66,262 @@ BACKUP_DIR = Path(__file__).parent / "backup_queue"
 DATABASE_FILE = Path(__file__).parent / "capture_tracking.db"
 MAX_RETRY_ATTEMPTS = 5
 RETRY_INTERVAL = 600  # 10 minutes in seconds
+MAX_RETRY_BACKOFF = 3600  # Retry interval cap while every retried upload keeps failing
+BACKLOG_MAX_AGE_HOURS = 24  # Pending captures older than this are dropped, not retried
+SYNC_CLAIM_TIMEOUT_MINUTES = 120  # 'syncing' rows left by a crashed retry/sync go back to 'pending' after this
+VACUUM_AFTER_DELETES = 10000  # Rebuild the database file once this many rows were expired
+DB_WRITE_BATCH = 64  # Max queued writes committed per transaction
+DB_WRITE_INTERVAL = 0.1  # seconds - how long the writer gathers a batch
+
+# Upload tracking statements - kept as constants so the connection's statement
+# cache reuses one compiled statement per query
+# UPSERT updates an existing row in place (keeps created_at and upload_attempts)
+# Timestamps come from SQLite's CURRENT_TIMESTAMP (UTC) rather than bound datetimes
+SQL_INSERT = '''
+    INSERT INTO upload_tracking
+    (filename, camera_name, local_path, capture_timestamp, upload_status,
+     file_size_kb, resolution, content_hash, upload_attempts)
+    VALUES (?, ?, ?, CURRENT_TIMESTAMP, ?, ?, ?, ?, 0)
+    ON CONFLICT(filename) DO UPDATE SET
+        camera_name = excluded.camera_name,
+        local_path = excluded.local_path,
+        upload_status = excluded.upload_status,
+        file_size_kb = excluded.file_size_kb,
+        resolution = excluded.resolution,
+        content_hash = excluded.content_hash
+'''
+SQL_UPDATE_SUCCESS = '''
+    UPDATE upload_tracking
+    SET upload_status = ?, supabase_url = ?, last_attempt = CURRENT_TIMESTAMP
+    WHERE filename = ?
+'''
+SQL_UPDATE_FAIL = '''
+    UPDATE upload_tracking
+    SET upload_status = ?, error_message = ?,
+        upload_attempts = upload_attempts + 1, last_attempt = CURRENT_TIMESTAMP
+    WHERE filename = ?
+'''
+DB_WRITE_SQL = {
+    'insert': SQL_INSERT,
+    'update_success': SQL_UPDATE_SUCCESS,
+    'update_fail': SQL_UPDATE_FAIL,
+}
+# Retried rows are claimed ('syncing') in the same statement that selects them, so
+# sync_backup_queue.py running alongside never uploads the same backups concurrently
+SQL_CLAIM_PENDING = '''
+    UPDATE upload_tracking
+    SET upload_status = 'syncing', last_attempt = CURRENT_TIMESTAMP
+    WHERE rowid IN (
+        SELECT rowid FROM upload_tracking
+        WHERE upload_status = 'pending'
+        AND upload_attempts < ?
+        ORDER BY capture_timestamp ASC
+        LIMIT 20
+    )
+    RETURNING filename, local_path, camera_name, resolution, file_size_kb
+'''
+SQL_RELEASE_STALE_CLAIMS = f'''
+    UPDATE upload_tracking
+    SET upload_status = 'pending'
+    WHERE upload_status = 'syncing'
+    AND last_attempt < datetime('now', '-{SYNC_CLAIM_TIMEOUT_MINUTES} minutes')
+'''
+# Drop-oldest policy: stale screenshots have little value and would otherwise pile up
+# on disk during a long outage (DELETE ... RETURNING needs SQLite >= 3.35)
+SQL_EXPIRE_PENDING = f'''
+    DELETE FROM upload_tracking
+    WHERE upload_status = 'pending'
+    AND capture_timestamp < datetime('now', '-{BACKLOG_MAX_AGE_HOURS} hours')
+    RETURNING local_path
+'''
 
 # Working camera configurations
 WORKING_CAMERAS = []
 
+def capture_filename(camera_name, timestamp, resolution):
+    """Name of a capture's backup file and its upload_tracking key
+
+    Cameras on one NVR are captured in the same second at the same resolution,
+    so the camera name is part of the name to keep tracking rows apart.
+    """
+    return f"{camera_name}_{timestamp}_{resolution.replace('x', '_')}.jpg"
+
+def open_capture(rtsp_url, timeout=CONNECTION_TIMEOUT):
+    """Open an RTSP capture with FFmpeg-enforced open/read timeouts (returns None on failure)"""
+    timeout_ms = int(timeout * 1000)
+    cap = cv2.VideoCapture(rtsp_url, cv2.CAP_FFMPEG, [
+        cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_ms,
+        cv2.CAP_PROP_READ_TIMEOUT_MSEC, timeout_ms
+    ])
+    if not cap.isOpened():
+        cap.release()
+        return None
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+def substream_url(rtsp_url):
+    """Return the NVR sub stream (s1) URL for a main stream (s0) URL, or the URL unchanged"""
+    return rtsp_url.replace('/s0/', '/s1/', 1)
+
+class CameraGrabber(threading.Thread):
+    """Keep one RTSP session open for a camera and hold only its newest frame
+
+    OpenCV's FFmpeg backend decodes inside grab(), so a grabber decodes every
+    frame its stream sends, around the clock. Reading the sub stream keeps that
+    to a fraction of the main stream's CPU cost across 30 cameras; the main
+    stream is only used when a camera has no sub stream.
+    """
+
+    def __init__(self, rtsp_url, name):
+        super().__init__(name=f"grabber-{name}", daemon=True)
+        self.rtsp_urls = [rtsp_url]
+        if GRAB_SUBSTREAM and substream_url(rtsp_url) != rtsp_url:
+            self.rtsp_urls.insert(0, substream_url(rtsp_url))
+        self.latest_frame = None
+        self.latest_time = 0.0
+        self.lock = threading.Lock()
+        self.ready = threading.Event()  # Set once the first frame is available
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            cap = None
+            for rtsp_url in self.rtsp_urls:
+                cap = open_capture(rtsp_url)
+                if cap is not None:
+                    break
+            if cap is None:
+                self.stop_event.wait(RECONNECT_DELAY)
+                continue
+
+            next_retrieve = 0.0
+            try:
+                # grab() (which decodes) every frame to keep the stream drained;
+                # only convert to BGR (retrieve) once per GRAB_INTERVAL
+                while not self.stop_event.is_set():
+                    if not cap.grab():
+                        break
+                    now = time.monotonic()
+                    if now < next_retrieve:
+                        continue
+                    ret, frame = cap.retrieve()
+                    if not ret or frame is None:
+                        break
+                    with self.lock:
+                        self.latest_frame = frame
+                        self.latest_time = now
+                    self.ready.set()
+                    next_retrieve = now + GRAB_INTERVAL
+            finally:
+                cap.release()
+
+            self.stop_event.wait(RECONNECT_DELAY)
+
+    def snapshot(self):
+        """Return the newest frame, or None if the stream has no recent frame"""
+        with self.lock:
+            if self.latest_frame is None or time.monotonic() - self.latest_time > SNAPSHOT_MAX_AGE:
+                return None
+            return self.latest_frame
+
+    def stop(self):
+        self.stop_event.set()
+
 class ResilientSupabaseAgent:
     def __init__(self):
-        self.active_cameras = {}
         self.capture_count = 0
         self.running = False
+        self.shutdown_event = threading.Event()  # Set on shutdown; wakes every interval wait
         self.start_time = datetime.now()
         self.upload_queue = Queue()
         self.failed_uploads = 0
         self.successful_uploads = 0
+        # Per-camera state, indexed by camera_config['idx'] (see init_camera_state)
+        self.grabbers = []  # CameraGrabber per camera
+        self.last_digest = []  # SHA-256 of each camera's last stored capture
+        self.capture_fail_count = array('i')  # Consecutive failed rounds per camera
+        self.turbojpeg = TurboJPEG() if TURBOJPEG_AVAILABLE else None
+        self.jpeg_buffers = threading.local()  # Per-thread reusable encode buffer
 
         # Setup components
+        self.setup_http_session()
         self.setup_directories()
         self.setup_database()
         self.load_camera_config()
         self.setup_signal_handlers()
 
+        # Persistent capture workers, reused every round
+        self.pool = ThreadPoolExecutor(max_workers=max(4, len(WORKING_CAMERAS)))
+        self.encode_pool = ThreadPoolExecutor(max_workers=ENCODE_WORKERS)
+
         # Start background retry thread
         self.start_retry_thread()
 
+    def setup_http_session(self):
+        """Create a keep-alive HTTP session so uploads reuse TCP/TLS connections"""
+        self.session = requests.Session()
+        # Transient network/server errors are retried by urllib3 with exponential backoff;
+        # raise_on_status=False hands the final error response back for logging
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                      allowed_methods=['POST'], raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'apikey': SUPABASE_ANON_KEY,
+            'Authorization': f'Bearer {SUPABASE_ANON_KEY}'
+        })
+
+        # Request headers and endpoint URLs are fixed; build them once for the hot path
+        self.upload_headers = {'Content-Type': 'image/jpeg'}
+        self.insert_headers = {'Content-Type': 'application/json', 'Prefer': 'return=minimal'}
+        self.storage_base = f"{SUPABASE_URL}/storage/v1/object/{STORAGE_BUCKET}/"
+        self.public_base = f"{SUPABASE_URL}/storage/v1/object/public/{STORAGE_BUCKET}/"
+        self.snapshot_url = f"{SUPABASE_URL}/rest/v1/ase_snapshot"
+
     def setup_directories(self):
         """Create necessary directories for backup"""
         self.backup_dir = BACKUP_DIR
         self.backup_dir.mkdir(exist_ok=True)
 
-        # Create subdirectories for each camera (legacy IP-based)
-        for i in range(20, 40):
-            camera_dir = self.backup_dir / f"camera_{i}"
-            camera_dir.mkdir(exist_ok=True)
-
-        # Create subdirectories for each channel (SmartICE NVR-based)
-        for i in range(1, 33):
-            channel_dir = self.backup_dir / f"channel_{i}"
-            channel_dir.mkdir(exist_ok=True)
+        # Camera subdirectories are created on a camera's first backup (see
+        # save_local_backup); remove empty ones left behind by earlier runs
+        self.created_backup_dirs = set()
+        with os.scandir(self.backup_dir) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    try:
+                        os.rmdir(entry.path)
+                    except OSError:
+                        pass  # Still holds pending backups
 
         print(f"📁 Backup directory ready: {self.backup_dir}")
 
     def setup_database(self):
         """Setup SQLite database for tracking uploads"""
         self.db_path = DATABASE_FILE
-        conn = sqlite3.connect(str(self.db_path))
-        cursor = conn.cursor()
+
+        # One connection for the process lifetime, shared by the capture and retry
+        # threads. Autocommit mode; multi-row updates use explicit BEGIN/COMMIT.
+        # RLock so the shutdown signal handler can't deadlock the main thread.
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None,
+                                    cached_statements=256)
+        self.db_lock = threading.RLock()
+        self.expired_since_vacuum = 0
+
+        # WAL + synchronous=NORMAL: commits no longer fsync the main database file
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA temp_store=MEMORY')
+        self.conn.execute('PRAGMA cache_size=-20000')  # ~20 MB page cache
 
         # Create tracking table
-        cursor.execute('''
+        self.conn.execute('''
             CREATE TABLE IF NOT EXISTS upload_tracking (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 filename TEXT UNIQUE NOT NULL,
                 camera_name TEXT NOT NULL,
                 local_path TEXT NOT NULL,
-                capture_timestamp DATETIME NOT NULL,
+                capture_timestamp DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
                 upload_status TEXT DEFAULT 'pending',
                 upload_attempts INTEGER DEFAULT 0,
                 last_attempt DATETIME,
@@ -103,21 +329,83 @@ class ResilientSupabaseAgent:
                 error_message TEXT,
                 file_size_kb REAL,
                 resolution TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                content_hash BLOB
             )
         ''')
 
+        # Databases created before content hashing lack the column
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(upload_tracking)')}
+        if 'content_hash' not in columns:
+            self.conn.execute('ALTER TABLE upload_tracking ADD COLUMN content_hash BLOB')
+
         # Create index for faster queries
-        cursor.execute('''
+        self.conn.execute('''
             CREATE INDEX IF NOT EXISTS idx_upload_status
             ON upload_tracking(upload_status)
         ''')
 
-        conn.commit()
-        conn.close()
+        # Pending rows in capture order (retry scan, backlog expiry, sync tool)
+        self.conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_pending
+            ON upload_tracking(upload_status, capture_timestamp)
+        ''')
+
+        # content_hash is only recorded, never looked up; drop the index older runs created
+        self.conn.execute('DROP INDEX IF EXISTS idx_content_hash')
+
+        # All writes go through one writer thread that commits them in batches
+        self.db_write_queue = Queue()
+        threading.Thread(target=self._db_writer, daemon=True).start()
 
         print(f"📊 Database initialized: {self.db_path}")
 
+    def _db_writer(self):
+        """Drain queued (kind, params) writes and commit them in grouped transactions"""
+        failed_since_flush = False
+        while True:
+            batch = [self.db_write_queue.get()]
+            deadline = time.monotonic() + DB_WRITE_INTERVAL
+            while len(batch) < DB_WRITE_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.db_write_queue.get(timeout=remaining))
+                except Empty:
+                    break
+
+            flushed = [params for kind, params in batch if kind == 'flush']
+            writes = [item for item in batch if item[0] != 'flush']
+            committed = False
+            with self.db_lock:
+                try:
+                    self.conn.execute('BEGIN')
+                    # Consecutive writes of the same kind share one executemany, in queue order
+                    for kind, group in groupby(writes, key=lambda item: item[0]):
+                        self.conn.executemany(DB_WRITE_SQL[kind], [item[1] for item in group])
+                    self.conn.execute('COMMIT')
+                    committed = True
+                except Exception as e:
+                    if self.conn.in_transaction:
+                        self.conn.execute('ROLLBACK')
+                    print(f"❌ Database write error ({len(writes)} queued writes dropped): {e}")
+
+            # Waiters learn whether everything queued since the last flush was committed
+            failed_since_flush = failed_since_flush or not committed
+            if flushed:
+                for event in flushed:
+                    event.committed = not failed_since_flush
+                    event.set()
+                failed_since_flush = False
+
+    def flush_db_writes(self, timeout=10):
+        """Block until every write queued so far is processed. Returns True only if all were committed"""
+        event = threading.Event()
+        event.committed = False
+        self.db_write_queue.put(('flush', event))
+        return event.wait(timeout) and event.committed
+
     def setup_signal_handlers(self):
         """Setup graceful shutdown handlers"""
         signal.signal(signal.SIGTERM, self.handle_shutdown)
@@ -127,7 +415,12 @@ class ResilientSupabaseAgent:
         """Handle graceful shutdown"""
         print(f"\n⚠️ Received shutdown signal. Saving state and cleaning up...")
         self.running = False
-        self.sync_pending_uploads()  # Try to upload any remaining items
+        self.shutdown_event.set()
+        self.stop_grabbers()
+        self.sync_pending_uploads()  # Try to upload any remaining items (uses the pool)
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.encode_pool.shutdown(wait=False, cancel_futures=True)
+        self.flush_db_writes()
         sys.exit(0)
 
     def load_camera_config(self):
@@ -166,68 +459,40 @@ class ResilientSupabaseAgent:
                 "status": "online"
             }]
 
-    def save_to_database(self, filename, camera_name, local_path, resolution, file_size_kb, status='pending'):
-        """Save capture information to database"""
-        conn = sqlite3.connect(str(self.db_path))
-        cursor = conn.cursor()
-
-        try:
-            cursor.execute('''
-                INSERT OR REPLACE INTO upload_tracking
-                (filename, camera_name, local_path, capture_timestamp, upload_status,
-                 file_size_kb, resolution, upload_attempts)
-                VALUES (?, ?, ?, ?, ?, ?, ?, 0)
-            ''', (filename, camera_name, local_path, datetime.now(), status, file_size_kb, resolution))
-
-            conn.commit()
-            return True
-        except Exception as e:
-            print(f"❌ Database error: {e}")
-            return False
-        finally:
-            conn.close()
+    def save_to_database(self, filename, camera_name, local_path, resolution, file_size_kb, status='pending',
+                         content_hash=None):
+        """Queue capture information for the database writer"""
+        self.db_write_queue.put(('insert', (filename, camera_name, local_path, status,
+                                            file_size_kb, resolution, content_hash)))
+        return True
 
     def update_upload_status(self, filename, status, url=None, error=None):
         """Update upload status in database"""
-        conn = sqlite3.connect(str(self.db_path))
-        cursor = conn.cursor()
+        self.update_upload_statuses([(filename, status, url, error)])
 
-        try:
+    def update_upload_statuses(self, updates):
+        """Queue (filename, status, url, error) updates for the database writer"""
+        for filename, status, url, error in updates:
             if status == 'success' and url:
-                cursor.execute('''
-                    UPDATE upload_tracking
-                    SET upload_status = ?, supabase_url = ?, last_attempt = ?
-                    WHERE filename = ?
-                ''', (status, url, datetime.now(), filename))
+                self.db_write_queue.put(('update_success', (status, url, filename)))
             else:
-                cursor.execute('''
-                    UPDATE upload_tracking
-                    SET upload_status = ?, error_message = ?,
-                        upload_attempts = upload_attempts + 1, last_attempt = ?
-                    WHERE filename = ?
-                ''', (status, error, datetime.now(), filename))
-
-            conn.commit()
-        except Exception as e:
-            print(f"❌ Database update error: {e}")
-        finally:
-            conn.close()
+                self.db_write_queue.put(('update_fail', (status, error, filename)))
 
-    def upload_to_supabase_storage(self, image_data, filename, retry_count=0):
-        """Upload image to Supabase storage with retry logic"""
+    def upload_to_supabase_storage(self, image_data, filename):
+        """Upload image to Supabase storage (transient failures retried by the session)
+
+        image_data may be bytes, a buffer view, or an open binary file (streamed by requests).
+        """
         try:
-            headers = {
-                'apikey': SUPABASE_ANON_KEY,
-                'Authorization': f'Bearer {SUPABASE_ANON_KEY}',
-                'Content-Type': 'image/jpeg'
-            }
+            # requests would send a memoryview as a chunked stream; copy it to bytes once
+            if isinstance(image_data, memoryview):
+                image_data = image_data.tobytes()
 
-            upload_url = f"{SUPABASE_URL}/storage/v1/object/{STORAGE_BUCKET}/{filename}"
-            response = requests.post(upload_url, headers=headers, data=image_data, timeout=30)
+            response = self.session.post(self.storage_base + filename, headers=self.upload_headers,
+                                         data=image_data, timeout=30)
 
             if response.status_code in [200, 201]:
-                public_url = f"{SUPABASE_URL}/storage/v1/object/public/{STORAGE_BUCKET}/{filename}"
-                return True, public_url
+                return True, self.public_base + filename
             else:
                 return False, f"Upload failed: {response.status_code} - {response.text}"
 
@@ -241,13 +506,6 @@ class ResilientSupabaseAgent:
     def insert_snapshot_record(self, image_url, camera_name, resolution, file_size_kb):
         """Insert record into ASE_Snapshot table"""
         try:
-            headers = {
-                'apikey': SUPABASE_ANON_KEY,
-                'Authorization': f'Bearer {SUPABASE_ANON_KEY}',
-                'Content-Type': 'application/json',
-                'Prefer': 'return=minimal'
-            }
-
             data = {
                 'image_url': image_url,
                 'camera_name': camera_name,
@@ -256,8 +514,7 @@ class ResilientSupabaseAgent:
                 'restaurant_id': None
             }
 
-            url = f"{SUPABASE_URL}/rest/v1/ase_snapshot"
-            response = requests.post(url, headers=headers, json=data, timeout=10)
+            response = self.session.post(self.snapshot_url, headers=self.insert_headers, json=data, timeout=10)
 
             if response.status_code in [200, 201]:
                 return True, "Record inserted successfully"
@@ -267,11 +524,48 @@ class ResilientSupabaseAgent:
         except Exception as e:
             return False, f"Exception during insert: {str(e)}"
 
+    def encode_jpeg(self, frame):
+        """Encode a BGR frame to JPEG. Returns the encoded bytes (a view into a reused buffer with TurboJPEG) or None"""
+        if self.turbojpeg is None:
+            success, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY,
+                                                           cv2.IMWRITE_JPEG_OPTIMIZE, 1])
+            return buffer.tobytes() if success else None
+
+        # Encode in place into this thread's buffer, growing it only for a larger resolution
+        buffer_size = self.turbojpeg.buffer_size(frame)
+        buffer = getattr(self.jpeg_buffers, 'buffer', None)
+        if buffer is None or len(buffer) < buffer_size:
+            buffer = bytearray(buffer_size)
+            self.jpeg_buffers.buffer = buffer
+
+        _, n_bytes = self.turbojpeg.encode(frame, quality=JPEG_QUALITY, dst=buffer)
+        return memoryview(buffer)[:n_bytes]
+
+    def prepare_image(self, frame):
+        """Downscale and JPEG-encode a frame (runs on the encoder pool). Returns (image_data, resolution)"""
+        # Downscale oversize frames (training doesn't need full resolution)
+        h, w = frame.shape[:2]
+        scale = TARGET_MAX_DIM / max(h, w)
+        if scale < 1:
+            frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        image_data = self.encode_jpeg(frame)
+        if image_data is None:
+            return None, None
+        # The TurboJPEG buffer belongs to this encoder thread and is reused by its next frame
+        if isinstance(image_data, memoryview):
+            image_data = image_data.tobytes()
+        return image_data, f"{frame.shape[1]}x{frame.shape[0]}"
+
     def save_local_backup(self, image_data, camera_name, timestamp, resolution):
         """Save image to local backup directory"""
         try:
-            filename = f"{timestamp}_{resolution.replace('x', '_')}.jpg"
-            local_path = self.backup_dir / camera_name / filename
+            filename = capture_filename(camera_name, timestamp, resolution)
+            camera_dir = self.backup_dir / camera_name
+            if camera_name not in self.created_backup_dirs:
+                camera_dir.mkdir(exist_ok=True)
+                self.created_backup_dirs.add(camera_name)
+            local_path = camera_dir / filename
 
             # Write image to file
             with open(local_path, 'wb') as f:
@@ -282,7 +576,7 @@ class ResilientSupabaseAgent:
             print(f"❌ Local save failed: {e}")
             return False, None, None
 
-    def test_camera_connection_ffmpeg(self, camera_config):
+    def test_camera_connection_ffmpeg(self, camera_config, timeout=CONNECTION_TIMEOUT):
         """Test camera connection using FFmpeg fallback"""
         import subprocess
         rtsp_url = camera_config['rtsp_url']
@@ -291,11 +585,11 @@ class ResilientSupabaseAgent:
             # Use ffprobe to test connection
             cmd = [
                 'ffprobe', '-v', 'quiet', '-show_streams', '-select_streams', 'v:0',
-                '-timeout', str(CONNECTION_TIMEOUT * 1000000), # microseconds
+                '-timeout', str(int(timeout * 1000000)), # microseconds
                 rtsp_url
             ]
 
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=CONNECTION_TIMEOUT + 2)
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout + 2)
 
             if result.returncode == 0 and 'codec_name=' in result.stdout:
                 return True, "FFmpeg connection successful"
@@ -312,39 +606,57 @@ class ResilientSupabaseAgent:
         rtsp_url = camera_config['rtsp_url']
         camera_ip = camera_config['ip']
 
-        # Try OpenCV first (3 attempts)
-        for attempt in range(RETRY_ATTEMPTS):
-            try:
-                print(f"🔍 Testing {camera_ip} with OpenCV (attempt {attempt + 1}/{RETRY_ATTEMPTS})...")
-                cap = cv2.VideoCapture(rtsp_url, cv2.CAP_FFMPEG)
-                cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        # All attempts share one monotonic deadline, so a dead camera costs at
+        # most CONNECTION_TEST_BUDGET seconds instead of every attempt's timeout
+        deadline = time.monotonic() + CONNECTION_TEST_BUDGET
 
-                start_time = time.time()
-                while not cap.isOpened() and (time.time() - start_time) < CONNECTION_TIMEOUT:
-                    time.sleep(0.1)
+        def remaining():
+            return max(0.0, deadline - time.monotonic())
 
-                if not cap.isOpened():
-                    cap.release()
-                    print(f"  ❌ OpenCV timeout (attempt {attempt + 1})")
-                    continue
+        # Try OpenCV first (3 attempts). One VideoCapture is reused and
+        # re-opened per attempt instead of constructing a new one each time
+        cap = cv2.VideoCapture()
+        try:
+            for attempt in range(RETRY_ATTEMPTS):
+                if remaining() <= 0:
+                    break
+                try:
+                    print(f"🔍 Testing {camera_ip} with OpenCV (attempt {attempt + 1}/{RETRY_ATTEMPTS})...")
+                    # open() blocks through the handshake; bound it natively so the
+                    # reused handle is never shared with a still-running worker
+                    open_timeout_ms = int(min(CONNECTION_TIMEOUT, remaining()) * 1000)
+                    cap.open(rtsp_url, cv2.CAP_FFMPEG,
+                             [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, open_timeout_ms,
+                              cv2.CAP_PROP_READ_TIMEOUT_MSEC, open_timeout_ms])
+                    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+                    if not cap.isOpened():
+                        print(f"  ❌ OpenCV timeout (attempt {attempt + 1})")
+                        continue
 
-                ret, frame = cap.read()
-                cap.release()
+                    ret, frame = cap.read()
 
-                if ret and frame is not None:
-                    print(f"  ✅ OpenCV success: {camera_ip}")
-                    return True, "OpenCV connected successfully"
-                else:
-                    print(f"  ⚠️ OpenCV no frame (attempt {attempt + 1})")
+                    if ret and frame is not None:
+                        print(f"  ✅ OpenCV success: {camera_ip}")
+                        return True, "OpenCV connected successfully"
+                    else:
+                        print(f"  ⚠️ OpenCV no frame (attempt {attempt + 1})")
 
-            except Exception as e:
-                print(f"  ❌ OpenCV exception (attempt {attempt + 1}): {str(e)}")
+                except Exception as e:
+                    print(f"  ❌ OpenCV exception (attempt {attempt + 1}): {str(e)}")
+        finally:
+            cap.release()
 
         # OpenCV failed, try FFmpeg fallback (3 attempts)
         print(f"🔄 OpenCV failed, trying FFmpeg fallback for {camera_ip}...")
         for attempt in range(RETRY_ATTEMPTS):
+            if remaining() <= 0:
+                print(f"  ⏱️ Connection test budget ({CONNECTION_TEST_BUDGET}s) exhausted for {camera_ip}")
+                break
             print(f"🔍 Testing {camera_ip} with FFmpeg (attempt {attempt + 1}/{RETRY_ATTEMPTS})...")
-            success, message = self.test_camera_connection_ffmpeg(camera_config)
+            success, message = self.test_camera_connection_ffmpeg(
+                camera_config, timeout=min(CONNECTION_TIMEOUT, remaining())
+            )
             if success:
                 print(f"  ✅ FFmpeg success: {camera_ip}")
                 return True, f"FFmpeg fallback: {message}"
@@ -358,35 +670,30 @@ class ResilientSupabaseAgent:
     def capture_and_process_screenshot(self, camera_config):
         """Capture screenshot with local backup and Supabase upload"""
         camera_ip = camera_config['ip']
-        rtsp_url = camera_config['rtsp_url']
+        cam_idx = camera_config['idx']
 
         for attempt in range(RETRY_ATTEMPTS):
             try:
-                cap = cv2.VideoCapture(rtsp_url, cv2.CAP_FFMPEG)
-                cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-
-                start_time = time.time()
-                while not cap.isOpened() and (time.time() - start_time) < CONNECTION_TIMEOUT:
-                    time.sleep(0.1)
-
-                if not cap.isOpened():
-                    cap.release()
-                    print(f"❌ Camera {camera_ip} - Connection failed (attempt {attempt + 1})")
-                    continue
-
-                ret, frame = cap.read()
-                cap.release()
-
-                if ret and frame is not None:
-                    # Encode image
-                    success, buffer = cv2.imencode('.jpg', frame)
-                    if not success:
+                # The camera's grabber thread keeps the stream open; just take its latest frame
+                grabber = self.grabbers[cam_idx]
+                frame = grabber.snapshot() if grabber else None
+
+                if frame is not None:
+                    # Encode image on the encoder pool so at most ENCODE_WORKERS
+                    # frames compete for CPU while other cameras upload
+                    image_data, resolution = self.encode_pool.submit(self.prepare_image, frame).result()
+                    if image_data is None:
                         print(f"❌ {camera_ip}: Failed to encode image")
                         continue
 
-                    image_data = buffer.tobytes()
                     file_size_kb = len(image_data) / 1024
 
+                    # Skip frames identical to this camera's last stored capture (static scenes)
+                    content_hash = hashlib.sha256(image_data).digest()
+                    if self.last_digest[cam_idx] == content_hash:
+                        print(f"⏭ {camera_ip}: unchanged since last capture, skipped")
+                        return True, "unchanged"
+
                     # Prepare metadata
                     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                     # Support both channel-based (SmartICE) and IP-based (legacy) naming
@@ -395,23 +702,15 @@ class ResilientSupabaseAgent:
                     else:
                         camera_suffix = camera_ip.split('.')[-1]
                         camera_name = f"camera_{camera_suffix}"
-                    resolution = camera_config['resolution']
-
-                    # Step 1: Always save local backup first
-                    local_success, local_path, local_filename = self.save_local_backup(
-                        image_data, camera_name, timestamp, resolution
-                    )
-
-                    if not local_success:
-                        print(f"❌ {camera_ip}: Failed to save local backup")
-                        continue
 
-                    # Step 2: Try Supabase upload (with machine ID prefix)
-                    supabase_filename = f"{MACHINE_ID}/{camera_name}/{timestamp}_{resolution.replace('x', '_')}.jpg"
+                    # Step 1: Upload straight from memory (with machine ID prefix);
+                    # the local backup is only written when the upload can't complete
+                    local_filename = capture_filename(camera_name, timestamp, resolution)
+                    supabase_filename = f"{MACHINE_ID}/{camera_name}/{local_filename}"
                     upload_success, result = self.upload_to_supabase_storage(image_data, supabase_filename)
 
                     if upload_success:
-                        # Step 3: Insert database record (with machine ID)
+                        # Step 2: Insert database record (with machine ID)
                         db_camera_name = f"{MACHINE_ID}_{camera_name}"
                         db_success, db_result = self.insert_snapshot_record(
                             result, db_camera_name, resolution, file_size_kb
@@ -421,32 +720,37 @@ class ResilientSupabaseAgent:
                             print(f"✅ {camera_ip}: Uploaded to Supabase ({file_size_kb:.1f} KB)")
                             self.successful_uploads += 1
 
-                            # Update tracking database
-                            self.save_to_database(local_filename, camera_name, local_path,
-                                                resolution, file_size_kb, 'success')
+                            # Update tracking database (nothing was written locally)
+                            self.save_to_database(local_filename, camera_name, '',
+                                                resolution, file_size_kb, 'success', content_hash)
                             self.update_upload_status(local_filename, 'success', result)
-
-                            # Delete local backup after successful upload
-                            try:
-                                os.remove(local_path)
-                            except:
-                                pass
+                            self.last_digest[cam_idx] = content_hash
 
                             return True, supabase_filename
-                        else:
-                            print(f"⚠️ {camera_ip}: Upload OK but database insert failed")
-                            self.save_to_database(local_filename, camera_name, local_path,
-                                                resolution, file_size_kb, 'pending')
+
+                    # Step 3: Upload or record insert failed - keep a local backup for the retry thread
+                    local_success, local_path, local_filename = self.save_local_backup(
+                        image_data, camera_name, timestamp, resolution
+                    )
+
+                    if not local_success:
+                        print(f"❌ {camera_ip}: Failed to save local backup")
+                        continue
+
+                    self.save_to_database(local_filename, camera_name, local_path,
+                                        resolution, file_size_kb, 'pending', content_hash)
+                    self.last_digest[cam_idx] = content_hash
+
+                    # The session already retried transient errors; leave the rest to the retry thread
+                    if upload_success:
+                        print(f"⚠️ {camera_ip}: Upload OK but database insert failed - queued for retry")
                     else:
-                        # Upload failed - keep local backup
                         print(f"💾 {camera_ip}: Saved to local backup (Supabase unavailable)")
-                        self.failed_uploads += 1
-                        self.save_to_database(local_filename, camera_name, local_path,
-                                            resolution, file_size_kb, 'pending')
-                        return True, local_path  # Still considered success (saved locally)
+                    self.failed_uploads += 1
+                    return True, local_path  # Still considered success (saved locally)
 
                 else:
-                    print(f"⚠️ Camera {camera_ip} - No frame received (attempt {attempt + 1})")
+                    print(f"⚠️ Camera {camera_ip} - No recent frame from stream (attempt {attempt + 1})")
 
             except Exception as e:
                 print(f"❌ Camera {camera_ip} - Exception: {str(e)} (attempt {attempt + 1})")
@@ -455,63 +759,137 @@ class ResilientSupabaseAgent:
 
         return False, "All attempts failed"
 
+    def init_camera_state(self, cameras):
+        """Give each camera a compact index and allocate the per-camera state arrays"""
+        for idx, camera_config in enumerate(cameras):
+            camera_config['idx'] = idx
+
+        self.grabbers = [None] * len(cameras)
+        self.last_digest = [None] * len(cameras)
+        self.capture_fail_count = array('i', [0] * len(cameras))
+
+    def start_grabbers(self, cameras):
+        """Start a background grabber per camera and wait briefly for first frames"""
+        for camera_config in cameras:
+            grabber = CameraGrabber(camera_config['rtsp_url'], camera_config.get('channel', camera_config['ip']))
+            grabber.start()
+            self.grabbers[camera_config['idx']] = grabber
+
+        deadline = time.monotonic() + CONNECTION_TIMEOUT * 2
+        for grabber in self.grabbers:
+            grabber.ready.wait(timeout=max(0.0, deadline - time.monotonic()))
+
+        ready = sum(1 for grabber in self.grabbers if grabber.ready.is_set())
+        print(f"📡 Camera streams open: {ready}/{len(self.grabbers)}")
+
+    def stop_grabbers(self):
+        """Signal all grabber threads to release their streams"""
+        for grabber in self.grabbers:
+            if grabber is not None:
+                grabber.stop()
+
     def start_retry_thread(self):
         """Start background thread for retrying failed uploads"""
         def retry_worker():
-            while self.running:
-                time.sleep(RETRY_INTERVAL)
-                self.sync_pending_uploads()
+            # Back off exponentially while Supabase is down, reset on any success
+            self.retry_backoff = RETRY_INTERVAL
+            while not self.shutdown_event.wait(self.retry_backoff):
+                try:
+                    succeeded, attempted = self.sync_pending_uploads()
+                except (sqlite3.Error, OSError) as e:
+                    # e.g. "database is locked" while the sync tool holds the write lock
+                    self.retry_backoff = min(self.retry_backoff * 2, MAX_RETRY_BACKOFF)
+                    print(f"❌ Retry round failed: {e}; next retry in {self.retry_backoff // 60} minutes")
+                    continue
+                if attempted and not succeeded:
+                    self.retry_backoff = min(self.retry_backoff * 2, MAX_RETRY_BACKOFF)
+                    print(f"⏳ All {attempted} retries failed; next retry in {self.retry_backoff // 60} minutes")
+                else:
+                    self.retry_backoff = RETRY_INTERVAL
 
         retry_thread = threading.Thread(target=retry_worker, daemon=True)
         retry_thread.start()
         print("🔄 Background retry thread started")
 
     def sync_pending_uploads(self):
-        """Retry uploading pending items from local backup"""
-        conn = sqlite3.connect(str(self.db_path))
-        cursor = conn.cursor()
-
-        # Get pending uploads (max 5 attempts)
-        cursor.execute('''
-            SELECT filename, local_path, camera_name, resolution, file_size_kb
-            FROM upload_tracking
-            WHERE upload_status = 'pending'
-            AND upload_attempts < ?
-            ORDER BY capture_timestamp ASC
-            LIMIT 20
-        ''', (MAX_RETRY_ATTEMPTS,))
-
-        pending_uploads = cursor.fetchall()
-        conn.close()
+        """Retry uploading pending items from local backup. Returns (succeeded, attempted) upload counts"""
+        self.expire_stale_backups()
+
+        # Claim pending uploads (max 5 attempts); every outcome below replaces the 'syncing' status
+        with self.db_lock:
+            self.conn.execute(SQL_RELEASE_STALE_CLAIMS)
+            pending_uploads = self.conn.execute(SQL_CLAIM_PENDING, (MAX_RETRY_ATTEMPTS,)).fetchall()
 
         if pending_uploads:
             print(f"🔄 Retrying {len(pending_uploads)} pending uploads...")
 
-            for filename, local_path, camera_name, resolution, file_size_kb in pending_uploads:
-                if not os.path.exists(local_path):
-                    self.update_upload_status(filename, 'missing')
-                    continue
+            # Upload the batch concurrently, then commit every status change in one
+            # transaction; files are only deleted once their 'success' row is committed
+            updates = list(self.pool.map(self._retry_one, pending_uploads))
+            self.update_upload_statuses(updates)
+            if self.flush_db_writes():
+                for (filename, status, url, error), row in zip(updates, pending_uploads):
+                    if status == 'success':
+                        try:
+                            os.unlink(row[1])  # Clean up after success
+                        except OSError:
+                            pass  # Already gone
+            else:
+                # Rows stay claimed until SYNC_CLAIM_TIMEOUT_MINUTES, so keep the backups for a later retry
+                print("⚠️ Upload statuses not committed, keeping local backups")
 
-                try:
-                    with open(local_path, 'rb') as f:
-                        image_data = f.read()
+            succeeded = sum(1 for update in updates if update[1] == 'success')
+            attempted = sum(1 for update in updates if update[1] != 'missing')
+            return succeeded, attempted
 
-                    supabase_filename = f"{camera_name}/{filename}"
-                    upload_success, result = self.upload_to_supabase_storage(image_data, supabase_filename)
+        return 0, 0
 
-                    if upload_success:
-                        db_success, _ = self.insert_snapshot_record(result, camera_name, resolution, file_size_kb)
-                        if db_success:
-                            print(f"✅ Retry successful: {filename}")
-                            self.update_upload_status(filename, 'success', result)
-                            os.remove(local_path)  # Clean up after success
-                        else:
-                            self.update_upload_status(filename, 'pending', error="DB insert failed")
-                    else:
-                        self.update_upload_status(filename, 'pending', error=result)
+    def expire_stale_backups(self):
+        """Delete pending captures past BACKLOG_MAX_AGE_HOURS along with their backup files"""
+        with self.db_lock:
+            expired = self.conn.execute(SQL_EXPIRE_PENDING).fetchall()
+        if not expired:
+            return
 
-                except Exception as e:
-                    self.update_upload_status(filename, 'pending', error=str(e))
+        for (local_path,) in expired:
+            try:
+                os.unlink(local_path)
+            except OSError:
+                pass  # Already gone
+
+        print(f"🗑️ Dropped {len(expired)} pending captures older than {BACKLOG_MAX_AGE_HOURS} hours")
+
+        self.expired_since_vacuum += len(expired)
+        if self.expired_since_vacuum > VACUUM_AFTER_DELETES:
+            with self.db_lock:
+                self.conn.execute('VACUUM')
+            self.expired_since_vacuum = 0
+            print("🧹 Database vacuumed")
+
+    def _retry_one(self, row):
+        """Re-upload one backed-up capture. Returns a (filename, status, url, error) update"""
+        filename, local_path, camera_name, resolution, file_size_kb = row
+        if not os.path.exists(local_path):
+            return (filename, 'missing', None, None)
+
+        try:
+            # Stream the backup from the page cache instead of reading it into memory
+            supabase_filename = f"{camera_name}/{filename}"
+            with open(local_path, 'rb') as f:
+                upload_success, result = self.upload_to_supabase_storage(f, supabase_filename)
+
+            if not upload_success:
+                return (filename, 'pending', None, result)
+
+            db_success, _ = self.insert_snapshot_record(result, camera_name, resolution, file_size_kb)
+            if not db_success:
+                return (filename, 'pending', None, "DB insert failed")
+
+            print(f"✅ Retry successful: {filename}")
+            return (filename, 'success', result, None)
+
+        except Exception as e:
+            return (filename, 'pending', None, str(e))
 
     def capture_all_cameras(self):
         """Capture screenshots from all working cameras with resilience"""
@@ -523,27 +901,21 @@ class ResilientSupabaseAgent:
         successful_captures = 0
         failed_captures = 0
 
-        threads = []
-        results = {}
-
-        def capture_worker(camera_config):
-            camera_ip = camera_config['ip']
-            success, result = self.capture_and_process_screenshot(camera_config)
-            results[camera_ip] = (success, result)
-
-        for camera_config in WORKING_CAMERAS:
-            thread = threading.Thread(target=capture_worker, args=(camera_config,))
-            thread.start()
-            threads.append(thread)
+        futures = {self.pool.submit(self.capture_and_process_screenshot, camera_config): camera_config['idx']
+                   for camera_config in WORKING_CAMERAS}
 
-        for thread in threads:
-            thread.join()
-
-        for camera_ip, (success, result) in results.items():
+        for future in as_completed(futures):
+            cam_idx = futures[future]
+            success, result = future.result()
             if success:
                 successful_captures += 1
+                self.capture_fail_count[cam_idx] = 0
             else:
                 failed_captures += 1
+                self.capture_fail_count[cam_idx] += 1
+                if self.capture_fail_count[cam_idx] > 1:
+                    camera_ip = WORKING_CAMERAS[cam_idx]['ip']
+                    print(f"⚠️ {camera_ip}: {self.capture_fail_count[cam_idx]} consecutive failed rounds")
 
         self.capture_count += 1
 
@@ -553,20 +925,15 @@ class ResilientSupabaseAgent:
 
     def get_backup_statistics(self):
         """Get statistics about backup queue"""
-        conn = sqlite3.connect(str(self.db_path))
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            SELECT
-                COUNT(*) as total,
-                SUM(CASE WHEN upload_status = 'pending' THEN 1 ELSE 0 END) as pending,
-                SUM(CASE WHEN upload_status = 'success' THEN 1 ELSE 0 END) as success,
-                SUM(CASE WHEN upload_status = 'failed' THEN 1 ELSE 0 END) as failed
-            FROM upload_tracking
-        ''')
-
-        stats = cursor.fetchone()
-        conn.close()
+        with self.db_lock:
+            stats = self.conn.execute('''
+                SELECT
+                    COUNT(*) as total,
+                    SUM(CASE WHEN upload_status = 'pending' THEN 1 ELSE 0 END) as pending,
+                    SUM(CASE WHEN upload_status = 'success' THEN 1 ELSE 0 END) as success,
+                    SUM(CASE WHEN upload_status = 'failed' THEN 1 ELSE 0 END) as failed
+                FROM upload_tracking
+            ''').fetchone()
 
         return stats
 
@@ -585,6 +952,13 @@ class ResilientSupabaseAgent:
 
         return True
 
+    def seconds_until_stop(self):
+        """Seconds left before the stop time or the maximum runtime, whichever comes first"""
+        now = datetime.now()
+        stop_at = min(now.replace(hour=STOP_TIME, minute=0, second=0, microsecond=0),
+                      self.start_time + timedelta(hours=MAX_RUNTIME_HOURS))
+        return max(0.0, (stop_at - now).total_seconds())
+
     def run_continuous_capture(self):
         """Run continuous screenshot capture with resilience"""
         print("🎥 Starting RESILIENT Linux camera capture with Supabase integration...")
@@ -622,6 +996,8 @@ class ResilientSupabaseAgent:
 
         WORKING_CAMERAS[:] = working_cameras
         self.running = True
+        self.init_camera_state(WORKING_CAMERAS)
+        self.start_grabbers(WORKING_CAMERAS)
 
         try:
             while self.running and self.should_continue_running():
@@ -632,19 +1008,18 @@ class ResilientSupabaseAgent:
 
                 print(f"⏳ Next capture in {CAPTURE_INTERVAL//60} minutes...")
 
-                sleep_time = 0
-                while sleep_time < CAPTURE_INTERVAL and self.running:
-                    time.sleep(10)
-                    sleep_time += 10
-
-                    if not self.should_continue_running():
-                        break
+                # Wake early for shutdown or when the run window closes
+                if self.shutdown_event.wait(min(CAPTURE_INTERVAL, self.seconds_until_stop())):
+                    break
 
         except KeyboardInterrupt:
             print("\n⚠️ Capture stopped by user")
 
         finally:
             self.running = False
+            self.shutdown_event.set()
+            self.stop_grabbers()
+            self.flush_db_writes()
             runtime = (datetime.now() - self.start_time).total_seconds() / 60
 
             # Final statistics
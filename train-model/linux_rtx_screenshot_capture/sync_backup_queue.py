@@ -1,14 +1,20 @@
 #!/usr/bin/env python3
 # Version: 1.0
 # Manual sync script to upload pending screenshots from backup queue to Supabase
-# Run this independently to clear the backup queue when network is available
+# Run this independently to clear the backup queue when network is available,
+# or with --daemon to keep syncing whenever the capture agent queues new rows
 
 import sqlite3
+import atexit
 import os
 import sys
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
 
 # Supabase Configuration (Private repo - credentials are safe)
 SUPABASE_URL = "https://wdpeoyugsxqnpwwtkqsl.supabase.co"
@@ -17,18 +23,35 @@ STORAGE_BUCKET = "ASE"
 
 DATABASE_FILE = Path(__file__).parent / "capture_tracking.db"
 BACKUP_DIR = Path(__file__).parent / "backup_queue"
+MAX_CONCURRENT_UPLOADS = 10  # Backups uploaded in parallel (network bound)
+SYNC_PAGE_SIZE = 500  # Pending rows read (and committed) per page
+WAL_SIZE_LIMIT = 4 * 1024 * 1024  # bytes
+VACUUM_FREELIST_PAGES = 1000  # --vacuum only rebuilds the file past this many free pages
+DAEMON_POLL_INTERVAL = 5  # seconds - how often --daemon checks for database changes
+DAEMON_SYNC_INTERVAL = 60  # seconds - --daemon retries pending rows at least this often
+DAEMON_MAX_BACKOFF = 3600  # seconds - retry interval cap while every upload keeps failing
+SYNC_CLAIM_TIMEOUT_MINUTES = 120  # Same as the capture agent: stale 'syncing' claims are released after this
+
+# One keep-alive session for the whole sync so every upload reuses the TCP/TLS
+# connection; transient errors are retried by urllib3 with exponential backoff
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=16, pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                      allowed_methods=['POST'], raise_on_status=False)
+))
+SESSION.headers.update({
+    'apikey': SUPABASE_ANON_KEY,
+    'Authorization': f'Bearer {SUPABASE_ANON_KEY}'
+})
 
 def upload_to_supabase(image_data, filename):
-    """Upload image to Supabase storage"""
+    """Upload image to Supabase storage (image_data may be bytes or an open binary file)"""
     try:
-        headers = {
-            'apikey': SUPABASE_ANON_KEY,
-            'Authorization': f'Bearer {SUPABASE_ANON_KEY}',
-            'Content-Type': 'image/jpeg'
-        }
+        headers = {'Content-Type': 'image/jpeg'}
 
         upload_url = f"{SUPABASE_URL}/storage/v1/object/{STORAGE_BUCKET}/{filename}"
-        response = requests.post(upload_url, headers=headers, data=image_data, timeout=30)
+        response = SESSION.post(upload_url, headers=headers, data=image_data, timeout=30)
 
         if response.status_code in [200, 201]:
             public_url = f"{SUPABASE_URL}/storage/v1/object/public/{STORAGE_BUCKET}/{filename}"
@@ -43,8 +66,6 @@ def insert_database_record(image_url, camera_name, resolution, file_size_kb):
     """Insert record into ASE_Snapshot table"""
     try:
         headers = {
-            'apikey': SUPABASE_ANON_KEY,
-            'Authorization': f'Bearer {SUPABASE_ANON_KEY}',
             'Content-Type': 'application/json',
             'Prefer': 'return=minimal'
         }
@@ -58,119 +79,227 @@ def insert_database_record(image_url, camera_name, resolution, file_size_kb):
         }
 
         url = f"{SUPABASE_URL}/rest/v1/ase_snapshot"
-        response = requests.post(url, headers=headers, json=data, timeout=10)
+        response = SESSION.post(url, headers=headers, json=data, timeout=10)
 
         return response.status_code in [200, 201]
 
     except:
         return False
 
+def upload_backup(row):
+    """Upload one backed-up screenshot and insert its record (runs on the upload pool)
+
+    Returns:
+        (filename, local_path, outcome, result) - outcome is 'success' (result is the
+        public URL), 'failed' (result is the error message) or 'missing'
+    """
+    filename, local_path, camera_name, resolution, file_size_kb = row
+
+    if not os.path.exists(local_path):
+        return filename, local_path, 'missing', None
+
+    try:
+        # Upload to Supabase, streaming the file instead of reading it into memory
+        supabase_filename = f"{camera_name}/{filename}"
+        with open(local_path, 'rb') as f:
+            upload_success, result = upload_to_supabase(f, supabase_filename)
+
+        if not upload_success:
+            return filename, local_path, 'failed', result
+
+        # Insert database record only once the image is in storage
+        if not insert_database_record(result, camera_name, resolution, file_size_kb):
+            return filename, local_path, 'failed', 'Database insert failed'
+
+        return filename, local_path, 'success', result
+
+    except Exception as e:
+        return filename, local_path, 'failed', str(e)
+
+# One writer and one read-only connection per process, opened on first use and
+# shared by sync, stats and cleanup (see get_connection)
+_connections = {}
+
+def get_connection(read_only=False):
+    """Return the shared tracking database connection, opening it on first use
+
+    Both connections use the pragmas shared with the capture agent. The writer runs
+    in autocommit mode; multi-row updates use explicit BEGIN/COMMIT.
+    """
+    conn = _connections.get(read_only)
+    if conn is not None:
+        return conn
+
+    if read_only:
+        conn = sqlite3.connect(f"{DATABASE_FILE.resolve().as_uri()}?mode=ro", uri=True,
+                               cached_statements=256)
+        conn.execute("PRAGMA query_only=ON")
+    else:
+        conn = sqlite3.connect(str(DATABASE_FILE), isolation_level=None, cached_statements=256)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA journal_size_limit={WAL_SIZE_LIMIT}")  # WAL truncated to this after checkpoints
+        # Pending scans and old-success cleanup become index range scans (databases
+        # created by older capture agents only index upload_status)
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_pending
+            ON upload_tracking(upload_status, capture_timestamp)
+        ''')
+    conn.execute("PRAGMA busy_timeout=5000")  # The capture agent may be writing
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")  # ~20 MB page cache
+
+    _connections[read_only] = conn
+    return conn
+
+@atexit.register
+def close_connections():
+    """Close the shared database connections"""
+    for conn in _connections.values():
+        conn.close()
+    _connections.clear()
+
+def claim_pending_pages(cursor):
+    """Claim pending upload rows oldest first, SYNC_PAGE_SIZE rows at a time
+
+    Each page is marked 'syncing' by the statement that selects it, so the capture
+    agent's retry thread (which only picks 'pending' rows) can't upload the same
+    backups concurrently. Pages are keyed on (capture_timestamp, rowid), so rows
+    that failed and went back to 'pending' aren't claimed again in the same run.
+    """
+    last_key = ('', 0)
+    while True:
+        rows = cursor.execute('''
+            UPDATE upload_tracking
+            SET upload_status = 'syncing', last_attempt = CURRENT_TIMESTAMP
+            WHERE rowid IN (
+                SELECT rowid FROM upload_tracking
+                WHERE upload_status = 'pending'
+                AND (capture_timestamp, rowid) > (?, ?)
+                ORDER BY capture_timestamp ASC, rowid ASC
+                LIMIT ?
+            )
+            RETURNING filename, local_path, camera_name, resolution, file_size_kb,
+                      capture_timestamp, rowid
+        ''', (*last_key, SYNC_PAGE_SIZE)).fetchall()
+        if not rows:
+            return
+
+        rows.sort(key=lambda row: row[-2:])  # RETURNING order is unspecified
+        last_key = rows[-1][-2:]
+        yield [row[:-2] for row in rows]
+
+def release_claims(conn, page):
+    """Return a page's rows that are still 'syncing' to 'pending' (best effort)"""
+    try:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        conn.executemany('''
+            UPDATE upload_tracking SET upload_status = 'pending'
+            WHERE filename = ? AND upload_status = 'syncing'
+        ''', [(row[0],) for row in page])
+    except sqlite3.Error as e:
+        # Still locked: the claim timeout releases them later
+        print(f"⚠️ Could not release claimed rows: {e}")
+
 def sync_backup_queue():
-    """Sync all pending uploads from backup queue"""
+    """Sync all pending uploads from backup queue. Returns (succeeded, attempted) upload counts"""
     db_path = DATABASE_FILE
 
     if not db_path.exists():
         print("❌ No backup database found")
-        return
+        return 0, 0
 
-    conn = sqlite3.connect(str(db_path))
+    # Each page of status updates is one explicit transaction
+    conn = get_connection()
     cursor = conn.cursor()
 
-    # Get all pending uploads
-    cursor.execute('''
-        SELECT filename, local_path, camera_name, resolution, file_size_kb, upload_attempts
-        FROM upload_tracking
-        WHERE upload_status = 'pending'
-        ORDER BY capture_timestamp ASC
+    # Rows claimed by a sync or retry that died mid-upload become pending again
+    cursor.execute(f'''
+        UPDATE upload_tracking
+        SET upload_status = 'pending'
+        WHERE upload_status = 'syncing'
+        AND last_attempt < datetime('now', '-{SYNC_CLAIM_TIMEOUT_MINUTES} minutes')
     ''')
 
-    pending_uploads = cursor.fetchall()
+    total_pending = cursor.execute(
+        "SELECT COUNT(*) FROM upload_tracking WHERE upload_status = 'pending'"
+    ).fetchone()[0]
 
-    if not pending_uploads:
+    if not total_pending:
         print("✅ No pending uploads in queue")
-        conn.close()
-        return
+        return 0, 0
 
-    print(f"📦 Found {len(pending_uploads)} pending uploads")
+    print(f"📦 Found {total_pending} pending uploads")
     print("=" * 50)
 
     successful = 0
     failed = 0
     missing = 0
 
-    for filename, local_path, camera_name, resolution, file_size_kb, attempts in pending_uploads:
-        print(f"📤 Uploading: {filename} (attempt #{attempts + 1})")
-
-        if not os.path.exists(local_path):
-            print(f"   ❌ File missing: {local_path}")
-            cursor.execute('''
-                UPDATE upload_tracking
-                SET upload_status = 'missing', last_attempt = ?
-                WHERE filename = ?
-            ''', (datetime.now(), filename))
-            missing += 1
-            continue
-
-        try:
-            with open(local_path, 'rb') as f:
-                image_data = f.read()
-
-            # Upload to Supabase
-            supabase_filename = f"{camera_name}/{filename}"
-            upload_success, result = upload_to_supabase(image_data, supabase_filename)
-
-            if upload_success:
-                # Insert database record
-                db_success = insert_database_record(result, camera_name, resolution, file_size_kb)
-
-                if db_success:
-                    print(f"   ✅ Successfully uploaded")
-                    cursor.execute('''
-                        UPDATE upload_tracking
-                        SET upload_status = 'success', supabase_url = ?, last_attempt = ?
-                        WHERE filename = ?
-                    ''', (result, datetime.now(), filename))
-
-                    # Delete local file after successful upload
-                    try:
-                        os.remove(local_path)
-                        print(f"   🗑️ Local file deleted")
-                    except:
-                        pass
-
-                    successful += 1
-                else:
-                    print(f"   ⚠️ Upload OK but database insert failed")
-                    cursor.execute('''
-                        UPDATE upload_tracking
-                        SET upload_attempts = upload_attempts + 1, last_attempt = ?,
-                            error_message = 'Database insert failed'
-                        WHERE filename = ?
-                    ''', (datetime.now(), filename))
-                    failed += 1
-            else:
-                print(f"   ❌ Upload failed: {result}")
-                cursor.execute('''
+    # Uploads run concurrently; results come back in queue order and all
+    # SQLite work stays on this thread
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_UPLOADS) as pool:
+        for page in claim_pending_pages(cursor):
+            # (params, ...) per outcome, committed together once the page is uploaded
+            successes = []
+            failures = []
+            missings = []
+            uploaded_paths = []
+
+            try:
+                outcomes = list(pool.map(upload_backup, page))
+
+                for filename, local_path, outcome, result in outcomes:
+                    if outcome == 'missing':
+                        missings.append((filename,))
+                    elif outcome == 'success':
+                        successes.append((result, filename))
+                        uploaded_paths.append(local_path)
+                    else:
+                        failures.append((result, filename))
+
+                conn.execute("BEGIN IMMEDIATE")
+                cursor.executemany('''
                     UPDATE upload_tracking
-                    SET upload_attempts = upload_attempts + 1, last_attempt = ?,
-                        error_message = ?
+                    SET upload_status = 'success', supabase_url = ?, last_attempt = CURRENT_TIMESTAMP
                     WHERE filename = ?
-                ''', (datetime.now(), result, filename))
-                failed += 1
-
-        except Exception as e:
-            print(f"   ❌ Error: {str(e)}")
-            cursor.execute('''
-                UPDATE upload_tracking
-                SET upload_attempts = upload_attempts + 1, last_attempt = ?,
-                    error_message = ?
-                WHERE filename = ?
-            ''', (datetime.now(), str(e), filename))
-            failed += 1
-
-        conn.commit()
-
-    conn.close()
+                ''', successes)
+                cursor.executemany('''
+                    UPDATE upload_tracking
+                    SET upload_status = 'pending', upload_attempts = upload_attempts + 1,
+                        last_attempt = CURRENT_TIMESTAMP, error_message = ?
+                    WHERE filename = ?
+                ''', failures)
+                cursor.executemany('''
+                    UPDATE upload_tracking
+                    SET upload_status = 'missing', last_attempt = CURRENT_TIMESTAMP
+                    WHERE filename = ?
+                ''', missings)
+                conn.execute("COMMIT")
+            except BaseException:
+                # Interrupted or locked out mid-page: hand the claimed rows back
+                # instead of leaving them 'syncing' until the timeout
+                release_claims(conn, page)
+                raise
+
+            # Delete local files only once their 'success' rows are committed
+            for local_path in uploaded_paths:
+                try:
+                    os.remove(local_path)
+                except:
+                    pass
+            successful += len(successes)
+            failed += len(failures)
+            missing += len(missings)
+
+            # One write per page instead of several per file
+            lines = [f"   ❌ {filename}: {error}" for error, filename in failures]
+            lines += [f"   ⚠️ File missing: {filename}" for filename, in missings]
+            lines.append(f"📤 {successful + failed + missing}/{total_pending} processed: "
+                         f"✅ {len(successes)} uploaded (local files deleted), "
+                         f"❌ {len(failures)} failed, ⚠️ {len(missings)} missing")
+            print("\n".join(lines))
 
     print("=" * 50)
     print("📊 Sync Complete:")
@@ -179,17 +308,69 @@ def sync_backup_queue():
     print(f"   ⚠️ Missing: {missing}")
 
     # Show remaining statistics
-    conn = sqlite3.connect(str(db_path))
-    cursor = conn.cursor()
+    cursor = get_connection(read_only=True).cursor()
     cursor.execute('''
         SELECT COUNT(*) FROM upload_tracking WHERE upload_status = 'pending'
     ''')
     remaining = cursor.fetchone()[0]
-    conn.close()
 
     if remaining > 0:
         print(f"   📦 Still pending: {remaining}")
 
+    return successful, successful + failed
+
+def run_daemon():
+    """Keep syncing as a long-lived process, reusing the HTTP session and database connections
+
+    PRAGMA data_version on the writer connection changes whenever another
+    connection (the capture agent) commits. The queue is only counted then, and
+    synced early only when the agent added pending rows and uploads aren't
+    currently backing off; otherwise pending rows wait for the retry interval.
+    """
+    if not DATABASE_FILE.exists():
+        print("❌ No backup database found")
+        return
+
+    conn = get_connection()
+    print(f"🔄 Sync daemon started (polling every {DAEMON_POLL_INTERVAL}s, Ctrl+C to stop)")
+
+    count_pending = "SELECT COUNT(*) FROM upload_tracking WHERE upload_status = 'pending'"
+    last_version = None
+    last_pending = 0
+    retry_interval = DAEMON_SYNC_INTERVAL
+    next_retry = 0.0
+    try:
+        while True:
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            due = time.monotonic() >= next_retry
+            if version != last_version or due:
+                last_version = version
+                pending = conn.execute(count_pending).fetchone()[0]
+                grew = pending > last_pending and retry_interval == DAEMON_SYNC_INTERVAL
+                last_pending = pending
+
+                if pending and (due or grew):
+                    try:
+                        succeeded, attempted = sync_backup_queue()
+                    except sqlite3.Error as e:
+                        # e.g. "database is locked" while the agent vacuums; retry later
+                        print(f"❌ Sync failed: {e}")
+                        succeeded, attempted = 0, 1
+                    # Back off while Supabase or the database is unavailable, reset on any success
+                    if attempted and not succeeded:
+                        retry_interval = min(retry_interval * 2, DAEMON_MAX_BACKOFF)
+                    else:
+                        retry_interval = DAEMON_SYNC_INTERVAL
+                    next_retry = time.monotonic() + retry_interval
+                    last_pending = conn.execute(count_pending).fetchone()[0]
+                elif due:
+                    next_retry = time.monotonic() + retry_interval
+
+            time.sleep(DAEMON_POLL_INTERVAL)
+
+    except KeyboardInterrupt:
+        print("\n⚠️ Sync daemon stopped by user")
+
 def show_statistics():
     """Show backup queue statistics"""
     db_path = DATABASE_FILE
@@ -198,8 +379,7 @@ def show_statistics():
         print("❌ No backup database found")
         return
 
-    conn = sqlite3.connect(str(db_path))
-    cursor = conn.cursor()
+    cursor = get_connection(read_only=True).cursor()
 
     cursor.execute('''
         SELECT
@@ -230,8 +410,6 @@ def show_statistics():
     if oldest:
         print(f"\n   Oldest pending: {oldest[0]}")
 
-    conn.close()
-
 def cleanup_old_backups(days=7):
     """Remove successfully uploaded backups older than specified days"""
     db_path = DATABASE_FILE
@@ -240,24 +418,46 @@ def cleanup_old_backups(days=7):
         print("❌ No backup database found")
         return
 
-    conn = sqlite3.connect(str(db_path))
+    conn = get_connection()
     cursor = conn.cursor()
 
-    cutoff_date = datetime.now().timestamp() - (days * 24 * 3600)
+    # Compare against a precomputed cutoff so the DELETE can seek idx_pending;
+    # formatted like SQLite's CURRENT_TIMESTAMP (UTC) to compare as text
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
 
     cursor.execute('''
         DELETE FROM upload_tracking
         WHERE upload_status = 'success'
-        AND julianday('now') - julianday(capture_timestamp) > ?
-    ''', (days,))
+        AND capture_timestamp < ?
+    ''', (cutoff,))
 
     deleted = cursor.rowcount
-    conn.commit()
-    conn.close()
+
+    # Fold the WAL back into the database so it doesn't keep growing between runs
+    conn.execute("PRAGMA wal_checkpoint(RESTART)")
 
     if deleted > 0:
         print(f"🗑️ Cleaned up {deleted} old successful uploads")
 
+def vacuum_database():
+    """Rebuild the database file when deleted rows left many free pages"""
+    db_path = DATABASE_FILE
+
+    if not db_path.exists():
+        print("❌ No backup database found")
+        return
+
+    conn = get_connection()
+    free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+    if free_pages <= VACUUM_FREELIST_PAGES:
+        print(f"✅ Database compact ({free_pages} free pages), nothing to vacuum")
+        return
+
+    conn.execute("VACUUM")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    print(f"🧹 Database vacuumed ({free_pages} free pages reclaimed)")
+
 def main():
     """Main function for manual sync"""
     if len(sys.argv) > 1:
@@ -265,11 +465,17 @@ def main():
             show_statistics()
         elif sys.argv[1] == "--cleanup":
             cleanup_old_backups()
+        elif sys.argv[1] == "--vacuum":
+            vacuum_database()
+        elif sys.argv[1] == "--daemon":
+            run_daemon()
         elif sys.argv[1] == "--help":
             print("Usage:")
             print("  python3 sync_backup_queue.py          # Sync pending uploads")
             print("  python3 sync_backup_queue.py --stats  # Show statistics")
             print("  python3 sync_backup_queue.py --cleanup # Clean old records")
+            print("  python3 sync_backup_queue.py --vacuum  # Reclaim free database pages")
+            print("  python3 sync_backup_queue.py --daemon  # Keep syncing as new rows are queued")
         else:
             print("Unknown option. Use --help for usage")
     else:
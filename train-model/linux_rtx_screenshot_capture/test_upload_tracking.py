@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Upload tracking tests - checks that captures from different cameras in the
+same second keep separate rows in the tracking database
+
+Usage:
+  python3 test_upload_tracking.py
+  python3 -m pytest test_upload_tracking.py
+"""
+
+import sqlite3
+
+from linux_capture_screenshots_to_supabase_resilient import SQL_INSERT, capture_filename
+
+SCHEMA = '''
+    CREATE TABLE upload_tracking (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        filename TEXT UNIQUE NOT NULL,
+        camera_name TEXT NOT NULL,
+        local_path TEXT NOT NULL,
+        capture_timestamp DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        upload_status TEXT DEFAULT 'pending',
+        upload_attempts INTEGER DEFAULT 0,
+        last_attempt DATETIME,
+        supabase_url TEXT,
+        error_message TEXT,
+        file_size_kb REAL,
+        resolution TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        content_hash BLOB
+    )
+'''
+
+def record(conn, camera_name, local_path, status):
+    """Insert one capture the way the agent's database writer does"""
+    filename = capture_filename(camera_name, "20251017_120000", "1920x1080")
+    conn.execute(SQL_INSERT, (filename, camera_name, local_path, status, 100.0, "1920x1080",
+                              camera_name.encode()))
+    return filename
+
+def test_same_second_captures_keep_separate_rows():
+    """Two cameras captured in the same second at the same resolution"""
+    conn = sqlite3.connect(":memory:")
+    conn.execute(SCHEMA)
+
+    pending = record(conn, "channel_1", "backup_queue/channel_1/a.jpg", "pending")
+    uploaded = record(conn, "channel_2", "", "success")
+
+    assert pending != uploaded
+    rows = dict((row[0], row[1:]) for row in conn.execute(
+        "SELECT filename, camera_name, local_path, upload_status FROM upload_tracking"))
+    assert rows == {
+        pending: ("channel_1", "backup_queue/channel_1/a.jpg", "pending"),
+        uploaded: ("channel_2", "", "success"),
+    }
+
+def test_recapture_updates_row_in_place():
+    """A second insert for the same camera and second replaces the row's capture fields"""
+    conn = sqlite3.connect(":memory:")
+    conn.execute(SCHEMA)
+
+    filename = record(conn, "channel_1", "", "success")
+    record(conn, "channel_1", "backup_queue/channel_1/a.jpg", "pending")
+
+    rows = conn.execute("SELECT filename, local_path, upload_status FROM upload_tracking").fetchall()
+    assert rows == [(filename, "backup_queue/channel_1/a.jpg", "pending")]
+
+if __name__ == "__main__":
+    test_same_second_captures_keep_separate_rows()
+    test_recapture_updates_row_in_place()
+    print("✅ Upload tracking tests passed")
@@ -6,50 +6,230 @@
 
 import cv2
 import time
+import atexit
 import threading
 import json
 import os
+import shutil
+import subprocess
+import numpy as np
 from datetime import datetime
 from pathlib import Path
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# orjson parses the camera config several times faster; stdlib json otherwise
+try:
+    import orjson
+
+    def parse_json_bytes(data):
+        return orjson.loads(data)
+except ImportError:
+    def parse_json_bytes(data):
+        return json.loads(data)
 
 # Configuration
 OUTPUT_DIR = "../raw_images"
 CAPTURE_INTERVAL = 300  # 5 minutes in seconds
 CONNECTION_TIMEOUT = 5  # seconds
 RETRY_ATTEMPTS = 3
+CONNECTION_TEST_WORKERS = 8  # Cameras tested concurrently (I/O bound)
+CAPTURE_WORKERS = 8  # Cameras captured concurrently per round
+JPEG_QUALITY = 82  # OpenCV defaults to 95, ~3x the bytes for training screenshots
+JPEG_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY, cv2.IMWRITE_JPEG_OPTIMIZE, 1,
+               cv2.IMWRITE_JPEG_PROGRESSIVE, 1]
+TARGET_MAX_WIDTH = 1280  # Wider frames are downscaled before encoding (training doesn't need more)
+IMAGE_WRITE_WORKERS = 4  # Background disk writers
+RECONNECT_DELAY = 5  # seconds - first wait before a camera worker re-opens a dropped stream
+MAX_RECONNECT_DELAY = 60  # seconds - reconnect backoff cap
 CAMERA_CONFIG_FILE = "../../test/camera_connection_results_20250927_230846.json"
 
-# Working camera configurations (loaded from test results)
-WORKING_CAMERAS = []
+# RTSP over TCP with a small jitter buffer (read by OpenCV's FFmpeg backend,
+# so it must be set before any VideoCapture)
+os.environ.setdefault('OPENCV_FFMPEG_CAPTURE_OPTIONS', 'rtsp_transport;tcp|max_delay;500000')
+
+# FFmpeg frame grab: no input buffering, low-delay decode, NVDEC when an NVIDIA GPU is present
+FFMPEG_AVAILABLE = shutil.which("ffmpeg") is not None
+FFMPEG_VIDEO_DECODER = "h264_cuvid" if shutil.which("nvidia-smi") else None
+
+def open_capture(rtsp_url, timeout=CONNECTION_TIMEOUT):
+    """Open an RTSP VideoCapture, giving up after timeout seconds. Returns the opened capture or None
+
+    FFmpeg enforces the open and per-frame read timeouts itself, so neither the
+    handshake nor a grab() on a dead stream can stall the caller.
+    """
+    timeout_ms = int(timeout * 1000)
+    cap = cv2.VideoCapture(rtsp_url, cv2.CAP_FFMPEG, [
+        cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_ms,
+        cv2.CAP_PROP_READ_TIMEOUT_MSEC, timeout_ms
+    ])
+    if not cap.isOpened():
+        cap.release()
+        return None
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+def capture_frame_ffmpeg(rtsp_url, width, height):
+    """Grab one BGR frame with an FFmpeg subprocess. Returns (frame, error)"""
+    cmd = ['ffmpeg', '-loglevel', 'error',
+           '-rtsp_transport', 'tcp', '-fflags', 'nobuffer', '-flags', 'low_delay']
+    if FFMPEG_VIDEO_DECODER:
+        cmd += ['-vcodec', FFMPEG_VIDEO_DECODER]
+    cmd += ['-i', rtsp_url, '-vframes', '1',
+            '-s', f'{width}x{height}', '-f', 'rawvideo', '-pix_fmt', 'bgr24', 'pipe:']
+
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                timeout=CONNECTION_TIMEOUT + 5)
+    except subprocess.TimeoutExpired:
+        return None, "Connection timeout"
+
+    frame_size = width * height * 3
+    if len(result.stdout) < frame_size:
+        return None, "No frame received"
+
+    frame = np.frombuffer(result.stdout[:frame_size], np.uint8).reshape(height, width, 3)
+    return frame, None
+
+def output_size(width, height):
+    """Size a width x height frame is saved at (downscaled to TARGET_MAX_WIDTH)"""
+    if width <= TARGET_MAX_WIDTH:
+        return width, height
+    return TARGET_MAX_WIDTH, int(height * TARGET_MAX_WIDTH / width)
+
+@lru_cache(maxsize=1)
+def _parse_camera_config_file(config_path, mtime_ns):
+    return parse_json_bytes(Path(config_path).read_bytes())
+
+def load_camera_config_file(config_path):
+    """Read and parse the camera test results, re-parsing only after the file changes"""
+    return _parse_camera_config_file(config_path, os.stat(config_path).st_mtime_ns)
+
+def read_latest_frame(cap, max_grabs=10, live_grab_seconds=0.03):
+    """
+    Drain OpenCV's RTSP frame queue, then decode only the newest frame.
+    Queued frames grab() in well under a millisecond; once a grab has to
+    wait for the camera the queue is empty and the next frame is live.
+    """
+    for _ in range(max_grabs):
+        start = time.monotonic()
+        if not cap.grab():
+            return False, None
+        if time.monotonic() - start > live_grab_seconds:
+            break
+    return cap.retrieve()
+
+# Open OpenCV captures kept across capture rounds, keyed by RTSP URL
+_cap_pool = {}
+_cap_pool_lock = threading.Lock()
+POOLED_MAX_GRABS = 200  # A handle idle between rounds can have a deep frame queue to drain
+
+def get_capture(rtsp_url):
+    """Return the pooled capture for rtsp_url, opening (or re-opening) it when needed"""
+    with _cap_pool_lock:
+        cap = _cap_pool.get(rtsp_url)
+    if cap is not None and cap.isOpened():
+        return cap
+    
+    cap = open_capture(rtsp_url)
+    if cap is not None:
+        with _cap_pool_lock:
+            _cap_pool[rtsp_url] = cap
+    return cap
+
+def drop_capture(rtsp_url):
+    """Release a pooled capture so the next read re-opens it"""
+    with _cap_pool_lock:
+        cap = _cap_pool.pop(rtsp_url, None)
+    if cap is not None:
+        cap.release()
+
+@atexit.register
+def release_all_captures():
+    with _cap_pool_lock:
+        caps = list(_cap_pool.values())
+        _cap_pool.clear()
+    for cap in caps:
+        cap.release()
+
+class CameraWorker(threading.Thread):
+    """Keep a camera's RTSP session open between rounds, grabbing (and discarding)
+    every frame so the next one decoded on request is live"""
+
+    def __init__(self, rtsp_url, name):
+        super().__init__(name=f"camera-{name}", daemon=True)
+        self.rtsp_url = rtsp_url
+        self.frame = None
+        self.frame_requested = threading.Event()
+        self.frame_done = threading.Event()
+        self.stop_event = threading.Event()
+
+    def run(self):
+        reconnect_delay = RECONNECT_DELAY
+        while not self.stop_event.is_set():
+            cap = get_capture(self.rtsp_url)
+            if cap is None:
+                self.stop_event.wait(reconnect_delay)
+                reconnect_delay = min(reconnect_delay * 2, MAX_RECONNECT_DELAY)
+                continue
+
+            reconnect_delay = RECONNECT_DELAY
+            while not self.stop_event.is_set():
+                if not cap.grab():
+                    break
+                if self.frame_requested.is_set():
+                    ret, frame = cap.retrieve()
+                    if not ret or frame is None:
+                        break
+                    self.frame = frame
+                    self.frame_requested.clear()
+                    self.frame_done.set()
+
+            drop_capture(self.rtsp_url)
+
+    def read(self, timeout=CONNECTION_TIMEOUT):
+        """Ask for the current frame and wait for it. Returns the frame or None"""
+        self.frame = None
+        self.frame_done.clear()
+        self.frame_requested.set()
+        if not self.frame_done.wait(timeout):
+            self.frame_requested.clear()
+            return None
+        return self.frame
+
+    def stop(self):
+        self.stop_event.set()
 
 class ScreenshotCaptureAgent:
     def __init__(self):
         self.active_cameras = {}
+        self.cameras = []  # Verified camera configurations (loaded from test results)
+        self.camera_workers = {}  # rtsp_url -> CameraWorker, once capture rounds start
         self.capture_count = 0
-        self.running = False
+        self.shutdown_event = threading.Event()  # Set to end the session; wakes the interval wait
+        self.write_executor = ThreadPoolExecutor(max_workers=IMAGE_WRITE_WORKERS)
+        # Reused every round; bounds concurrent camera reads
+        self.capture_pool = ThreadPoolExecutor(max_workers=CAPTURE_WORKERS, thread_name_prefix="cap")
         self.load_camera_config()
         self.setup_output_directory()
     
     def load_camera_config(self):
         """Load verified camera configurations from connection test results"""
-        global WORKING_CAMERAS
-        
         try:
             config_path = Path(__file__).parent / CAMERA_CONFIG_FILE
-            with open(config_path, 'r') as f:
-                data = json.load(f)
-                WORKING_CAMERAS = data.get('successful_connections', [])
+            data = load_camera_config_file(str(config_path))
+            self.cameras = list(data.get('successful_connections', []))
             
-            print(f"📋 Loaded {len(WORKING_CAMERAS)} verified camera configurations")
+            print(f"📋 Loaded {len(self.cameras)} verified camera configurations")
             
             # Display camera summary
-            for i, camera in enumerate(WORKING_CAMERAS, 1):
+            for i, camera in enumerate(self.cameras, 1):
                 print(f"   {i}. {camera['ip']} ({camera['resolution']}) - {camera['status']}")
         
         except FileNotFoundError:
             print("⚠️ Camera config file not found. Using fallback configuration.")
             # Fallback to a working camera from the previous configuration
-            WORKING_CAMERAS = [{
+            self.cameras = [{
                 "ip": "202.168.40.35",
                 "username": "admin", 
                 "password": "123456",
@@ -63,31 +243,45 @@ class ScreenshotCaptureAgent:
         os.makedirs(OUTPUT_DIR, exist_ok=True)
         print(f"📁 Output directory: {OUTPUT_DIR}")
     
-    def test_camera_connection(self, camera_config):
-        """Test if camera is accessible before starting capture"""
+    def read_frame(self, camera_config):
+        """Read a single frame from a camera (FFmpeg when installed, OpenCV otherwise or as fallback). Returns (frame, error)"""
         rtsp_url = camera_config['rtsp_url']
+
+        # During capture rounds the camera's worker already holds a live stream
+        worker = self.camera_workers.get(rtsp_url)
+        if worker is not None:
+            frame = worker.read()
+            return (frame, None) if frame is not None else (None, "No frame received")
+
+        if FFMPEG_AVAILABLE:
+            width, height = map(int, camera_config['resolution'].split('x'))
+            frame, error = capture_frame_ffmpeg(rtsp_url, width, height)
+            # An unreachable camera won't do better over OpenCV, but a stream FFmpeg
+            # couldn't decode (e.g. H.265 on h264_cuvid) may
+            if frame is not None or error == "Connection timeout":
+                return frame, error
+
+        # Reuse the camera's open session so later rounds skip the RTSP handshake
+        cap = get_capture(rtsp_url)
+        if cap is None:
+            return None, "Connection timeout"
         
+        # Capture the newest frame, not the oldest buffered one
+        ret, frame = read_latest_frame(cap, max_grabs=POOLED_MAX_GRABS)
+        
+        if ret and frame is not None:
+            return frame, None
+        drop_capture(rtsp_url)  # Stale or dropped session; re-open on the next attempt
+        return None, "No frame received"
+    
+    def test_camera_connection(self, camera_config):
+        """Test if camera is accessible before starting capture"""
         try:
-            cap = cv2.VideoCapture(rtsp_url, cv2.CAP_FFMPEG)
-            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-            
-            # Test connection with timeout
-            start_time = time.time()
-            while not cap.isOpened() and (time.time() - start_time) < CONNECTION_TIMEOUT:
-                time.sleep(0.1)
-            
-            if not cap.isOpened():
-                cap.release()
-                return False, "Connection timeout"
-            
-            # Test frame capture
-            ret, frame = cap.read()
-            cap.release()
-            
-            if ret and frame is not None:
+            frame, error = self.read_frame(camera_config)
+            if frame is not None:
                 return True, "Connected successfully"
             else:
-                return False, "No frame received"
+                return False, error
         
         except Exception as e:
             return False, f"Exception: {str(e)}"
@@ -95,45 +289,29 @@ class ScreenshotCaptureAgent:
     def capture_screenshot_from_camera(self, camera_config):
         """Capture a single screenshot from specified camera"""
         camera_ip = camera_config['ip']
-        rtsp_url = camera_config['rtsp_url']
         
         for attempt in range(RETRY_ATTEMPTS):
             try:
-                cap = cv2.VideoCapture(rtsp_url, cv2.CAP_FFMPEG)
-                cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-                
-                # Connection timeout
-                start_time = time.time()
-                while not cap.isOpened() and (time.time() - start_time) < CONNECTION_TIMEOUT:
-                    time.sleep(0.1)
+                frame, error = self.read_frame(camera_config)
                 
-                if not cap.isOpened():
-                    cap.release()
+                if error == "Connection timeout":
                     print(f"❌ Camera {camera_ip} - Connection failed (attempt {attempt + 1})")
                     continue
                 
-                # Capture frame
-                ret, frame = cap.read()
-                cap.release()
-                
-                if ret and frame is not None:
+                if frame is not None:
                     # Generate filename with timestamp and camera info
                     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                     camera_suffix = camera_ip.split('.')[-1]  # Last octet of IP
-                    resolution = camera_config['resolution'].replace('x', '_')
+                    height, width = frame.shape[:2]
+                    resolution = '_'.join(map(str, output_size(width, height)))  # Saved size
                     filename = f"camera_{camera_suffix}_{resolution}_{timestamp}.jpg"
                     filepath = os.path.join(OUTPUT_DIR, filename)
                     
-                    # Save image
-                    success = cv2.imwrite(filepath, frame)
-                    
-                    if success:
-                        file_size = os.path.getsize(filepath) / 1024  # KB
-                        print(f"📸 {camera_ip}: {filename} ({file_size:.1f} KB)")
-                        return True, filepath
-                    else:
-                        print(f"❌ {camera_ip}: Failed to save image")
-                        return False, "Save failed"
+                    # JPEG encode and disk write run on the writer pool (libjpeg
+                    # releases the GIL), so this thread is free for the next camera
+                    self.write_image(filepath, frame)
+                    print(f"📸 {camera_ip}: {filename}")
+                    return True, filepath
                 else:
                     print(f"⚠️ Camera {camera_ip} - No frame received (attempt {attempt + 1})")
             
@@ -144,6 +322,44 @@ class ScreenshotCaptureAgent:
         
         return False, "All attempts failed"
     
+    def write_image(self, filepath, frame):
+        """Downscale and encode a frame to JPEG, then write it, on a background thread"""
+        def encode_and_write():
+            image = frame
+            height, width = image.shape[:2]
+            size = output_size(width, height)
+            if size != (width, height):
+                image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+            success, buffer = cv2.imencode('.jpg', image, JPEG_PARAMS)
+            if not success:
+                raise RuntimeError("JPEG encode failed")
+            Path(filepath).write_bytes(buffer.tobytes())
+            return len(buffer) / 1024  # KB
+        
+        def report_result(future):
+            if future.exception() is not None:
+                print(f"❌ Failed to save {os.path.basename(filepath)}: {future.exception()}")
+            else:
+                print(f"💾 Saved {os.path.basename(filepath)} ({future.result():.1f} KB)")
+        
+        future = self.write_executor.submit(encode_and_write)
+        future.add_done_callback(report_result)
+    
+    def start_camera_workers(self, cameras):
+        """Start one persistent stream worker per camera"""
+        for camera_config in cameras:
+            worker = CameraWorker(camera_config['rtsp_url'], camera_config['ip'])
+            worker.start()
+            self.camera_workers[camera_config['rtsp_url']] = worker
+
+    def stop_camera_workers(self):
+        """Stop the camera workers and wait for them to release their streams"""
+        for worker in self.camera_workers.values():
+            worker.stop()
+        for worker in self.camera_workers.values():
+            worker.join(timeout=CONNECTION_TIMEOUT)  # Let it finish its last grab and release
+        self.camera_workers = {}
+
     def capture_all_cameras(self):
         """Capture screenshots from all working cameras"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -153,24 +369,12 @@ class ScreenshotCaptureAgent:
         successful_captures = 0
         failed_captures = 0
         
-        # Use threading for parallel capture
-        threads = []
+        # Capture in parallel on the pool; results are collected on this thread
+        futures = {self.capture_pool.submit(self.capture_screenshot_from_camera, camera_config): camera_config['ip']
+                   for camera_config in self.cameras}
         results = {}
-        
-        def capture_worker(camera_config):
-            camera_ip = camera_config['ip']
-            success, result = self.capture_screenshot_from_camera(camera_config)
-            results[camera_ip] = (success, result)
-        
-        # Start capture threads
-        for camera_config in WORKING_CAMERAS:
-            thread = threading.Thread(target=capture_worker, args=(camera_config,))
-            thread.start()
-            threads.append(thread)
-        
-        # Wait for all captures to complete
-        for thread in threads:
-            thread.join()
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
         
         # Process results
         for camera_ip, (success, result) in results.items():
@@ -188,16 +392,14 @@ class ScreenshotCaptureAgent:
     
     def run_continuous_capture(self, duration_hours=None):
         """Run continuous screenshot capture every 5 minutes"""
-        global WORKING_CAMERAS
-
         print("🎥 Starting multi-camera screenshot capture agent...")
-        print(f"📋 Monitoring {len(WORKING_CAMERAS)} cameras")
+        print(f"📋 Monitoring {len(self.cameras)} cameras")
         print(f"⏱️ Capture interval: {CAPTURE_INTERVAL} seconds ({CAPTURE_INTERVAL//60} minutes)")
         print(f"📁 Output directory: {OUTPUT_DIR}")
 
         if duration_hours:
             print(f"⏰ Will run for {duration_hours} hours")
-            end_time = time.time() + (duration_hours * 3600)
+            end_time = time.monotonic() + (duration_hours * 3600)
         else:
             print("⏰ Running indefinitely (Ctrl+C to stop)")
             end_time = None
@@ -207,8 +409,11 @@ class ScreenshotCaptureAgent:
         # Test all cameras before starting
         print("🔍 Testing camera connections...")
         working_cameras = []
-        for camera_config in WORKING_CAMERAS:
-            success, message = self.test_camera_connection(camera_config)
+        # Probe all cameras at once so dead ones time out together
+        with ThreadPoolExecutor(max_workers=CONNECTION_TEST_WORKERS) as executor:
+            test_results = list(executor.map(self.test_camera_connection, self.cameras))
+
+        for camera_config, (success, message) in zip(self.cameras, test_results):
             if success:
                 working_cameras.append(camera_config)
                 print(f"✅ {camera_config['ip']}: {message}")
@@ -223,37 +428,37 @@ class ScreenshotCaptureAgent:
         print("=" * 60)
 
         # Update working cameras list
-        WORKING_CAMERAS = working_cameras
+        self.cameras = working_cameras
+        self.start_camera_workers(self.cameras)
         
-        self.running = True
+        # Rounds start on an absolute CAPTURE_INTERVAL grid, so the time a round
+        # takes doesn't shift the cadence
+        next_tick = time.monotonic()
         
         try:
-            while self.running:
+            while not self.shutdown_event.is_set():
                 # Capture from all cameras
                 successful, failed = self.capture_all_cameras()
                 
+                # Wait for next capture (returns early at the duration limit)
+                next_tick = max(next_tick + CAPTURE_INTERVAL, time.monotonic())  # No catch-up burst after an overrun
+                wake_at = min(next_tick, end_time) if end_time else next_tick
+                print(f"⏳ Next capture in {max(0, next_tick - time.monotonic()) / 60:.1f} minutes...")
+                self.shutdown_event.wait(max(0, wake_at - time.monotonic()))
+                
                 # Check if should continue
-                if end_time and time.time() >= end_time:
+                if end_time and time.monotonic() >= end_time:
                     print(f"\n⏰ Duration limit reached. Stopping.")
                     break
-                
-                # Wait for next capture
-                print(f"⏳ Next capture in {CAPTURE_INTERVAL//60} minutes...")
-                
-                # Sleep with periodic checks for interruption
-                sleep_time = 0
-                while sleep_time < CAPTURE_INTERVAL and self.running:
-                    time.sleep(10)  # Check every 10 seconds
-                    sleep_time += 10
-                    
-                    if end_time and time.time() >= end_time:
-                        break
         
         except KeyboardInterrupt:
             print("\n⚠️ Capture stopped by user")
         
         finally:
-            self.running = False
+            self.shutdown_event.set()
+            self.stop_camera_workers()
+            self.capture_pool.shutdown(wait=True)
+            self.write_executor.shutdown(wait=True)  # Flush pending image writes
             print(f"\n✅ Capture session complete!")
             print(f"📊 Total capture rounds: {self.capture_count}")
             print(f"📁 Images saved to: {OUTPUT_DIR}")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# Version: 1.0
+# Export an INT8 TensorRT engine of the person detector used by 2_extract_persons.py
+# Calibrates on a random sample of the raw screenshots (same cameras, same lighting)
+
+import os
+import random
+import tempfile
+from pathlib import Path
+from ultralytics import YOLO
+
+# Paths
+IMAGES_DIR = "../raw_images"
+MODEL_PATH = "yolov8s.pt"
+
+# Export settings (must match 2_extract_persons.py)
+IMGSZ = 640
+BATCH_SIZE = 8
+ENGINE_PATH = f"yolov8s_{IMGSZ}_int8.engine"
+CALIBRATION_IMAGES = 100  # Representative frames used to pick INT8 ranges
+
+def write_calibration_data(workdir):
+    """Write a dataset yaml whose val split is a sample of the raw screenshots"""
+    image_files = []
+    for ext in ['*.jpg', '*.jpeg', '*.png', '*.bmp']:
+        image_files.extend(Path(IMAGES_DIR).glob(ext))
+
+    if not image_files:
+        raise FileNotFoundError(f"No calibration images found in {IMAGES_DIR}")
+
+    sample = random.sample(image_files, min(CALIBRATION_IMAGES, len(image_files)))
+    image_list = Path(workdir) / "calibration_images.txt"
+    image_list.write_text("\n".join(str(p.resolve()) for p in sample) + "\n")
+
+    data_yaml = Path(workdir) / "calib.yaml"
+    data_yaml.write_text(
+        f"train: {image_list}\n"
+        f"val: {image_list}\n"
+        "names:\n"
+        "  0: person\n"
+    )
+    print(f"📁 Calibration set: {len(sample)} image(s) from {IMAGES_DIR}")
+    return data_yaml
+
+def export_int8_engine():
+    """Export yolov8s to an INT8 TensorRT engine next to the FP16 one"""
+    print("🚀 Exporting INT8 TensorRT engine...")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        data_yaml = write_calibration_data(workdir)
+        exported = YOLO(MODEL_PATH).export(format="engine", int8=True, dynamic=True,
+                                           batch=BATCH_SIZE, imgsz=IMGSZ, data=str(data_yaml))
+
+    os.replace(exported, ENGINE_PATH)
+    print(f"✅ INT8 engine saved: {ENGINE_PATH}")
+    print("   2_extract_persons.py will use it automatically")
+
+if __name__ == "__main__":
+    export_int8_engine()
@@ -4,7 +4,9 @@
 
 import cv2
 import os
+import time
 import hashlib
+import threading
 from collections import defaultdict
 import shutil
 
@@ -16,6 +18,18 @@ def get_file_hash(filepath):
     with open(filepath, 'rb') as f:
         return hashlib.md5(f.read()).hexdigest()
 
+def move_tree_aside(path):
+    """
+    Rename a directory out of the way (one syscall) and delete it on a background thread.
+    The trash dir sits next to the original so the rename never crosses filesystems.
+    Returns the deleting thread; the interpreter waits for it before exiting.
+    """
+    trash_path = f"{os.path.normpath(path)}.trash-{os.getpid()}-{time.time_ns()}"
+    os.rename(path, trash_path)
+    thread = threading.Thread(target=shutil.rmtree, args=(trash_path,), kwargs={"ignore_errors": True})
+    thread.start()
+    return thread
+
 def remove_duplicates():
     """Remove duplicate images, keeping only the first occurrence"""
     print("🗑️  Starting duplicate removal...\n")
@@ -50,10 +64,12 @@ def remove_duplicates():
         print("🗑️  Removing duplicates...")
         for i, dup_path in enumerate(duplicates_to_remove, 1):
             try:
-                os.remove(dup_path)
+                os.unlink(dup_path)
                 if i % 50 == 0:
                     print(f"   Removed {i}/{len(duplicates_to_remove)} files...")
-            except Exception as e:
+            except FileNotFoundError:
+                pass  # Already gone
+            except OSError as e:
                 print(f"   ⚠️  Failed to remove {dup_path}: {e}")
 
         print(f"✅ Removed {len(duplicates_to_remove)} duplicate files")
@@ -62,18 +78,29 @@ def remove_duplicates():
     print("\n🧹 Cleaning labeled-persons directory...")
 
     if os.path.exists(LABELED_DIR):
-        # Remove all subdirectories and files
-        for item in os.listdir(LABELED_DIR):
-            item_path = os.path.join(LABELED_DIR, item)
-            try:
-                if os.path.isdir(item_path):
-                    shutil.rmtree(item_path)
-                    print(f"   📁 Removed directory: {item}")
-                else:
-                    os.remove(item_path)
-                    print(f"   📄 Removed file: {item}")
-            except Exception as e:
-                print(f"   ⚠️  Failed to remove {item}: {e}")
+        try:
+            # Renaming is one syscall however many images were labeled; the
+            # old tree is deleted on a background thread
+            move_tree_aside(LABELED_DIR)
+            print("   📁 Moved old labeled-persons aside (deleting in background)")
+        except OSError as e:
+            print(f"   ⚠️  Could not move labeled-persons aside ({e}), deleting in place")
+
+            # Remove all subdirectories and files (scandir entries carry the
+            # file type, so no extra stat per item)
+            with os.scandir(LABELED_DIR) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            shutil.rmtree(entry.path)
+                            print(f"   📁 Removed directory: {entry.name}")
+                        else:
+                            os.unlink(entry.path)
+                            print(f"   📄 Removed file: {entry.name}")
+                    except FileNotFoundError:
+                        pass  # Already gone
+                    except OSError as e:
+                        print(f"   ⚠️  Failed to remove {entry.name}: {e}")
 
         # Recreate clean structure
         os.makedirs(f"{LABELED_DIR}/waiters", exist_ok=True)
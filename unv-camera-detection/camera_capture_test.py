@@ -15,6 +15,23 @@ from datetime import datetime
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+# Use orjson for the results file when available (C encoder, writes bytes)
+try:
+    import orjson
+
+    def dump_json_bytes(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    def dump_json_bytes(obj):
+        return json.dumps(obj, indent=2).encode("utf-8")
+
+# RTSP over TCP with a small jitter buffer and a hard 3s socket timeout
+# (read by OpenCV's FFmpeg backend, so it must be set before any VideoCapture)
+os.environ.setdefault(
+    'OPENCV_FFMPEG_CAPTURE_OPTIONS',
+    'rtsp_transport;tcp|stimeout;3000000|max_delay;500000|buffer_size;65536'
+)
+
 # NVR Configuration
 NVR_CONFIG = {
     "ip": "192.168.1.3",
@@ -28,6 +45,15 @@ NVR_CONFIG = {
 OUTPUT_DIR = Path(__file__).parent / "camera_test_results"
 SCREENSHOTS_PER_CAMERA = 5
 CAPTURE_INTERVAL = 1.0  # 1 second between captures (5 captures in 5 seconds)
+OPEN_TIMEOUT_MS = 5000  # RTSP open timeout (enforced by FFmpeg)
+READ_TIMEOUT_MS = 5000  # Per-frame read timeout (enforced by FFmpeg)
+
+# Hardware decode: decodebin picks NVDEC/VAAPI decoders when the GStreamer
+# plugins are installed. Falls back to FFmpeg (software decode) if OpenCV was
+# built without GStreamer or the pipeline fails to open
+USE_HW_DECODE = True
+GST_PIPELINE = ("rtspsrc location={url} protocols=tcp latency=100 ! decodebin ! "
+                "videoconvert ! video/x-raw,format=BGR ! appsink max-buffers=1 drop=true sync=false")
 
 
 def get_rtsp_url(channel, stream_type="s0"):
@@ -36,9 +62,46 @@ def get_rtsp_url(channel, stream_type="s0"):
             f"{NVR_CONFIG['ip']}:{NVR_CONFIG['port']}/unicast/c{channel}/{stream_type}/live")
 
 
-def capture_camera_screenshots(channel):
+_gstreamer_available = None
+
+
+def gstreamer_available():
+    """Check once whether this OpenCV build includes the GStreamer backend"""
+    global _gstreamer_available
+    if _gstreamer_available is None:
+        build_info = cv2.getBuildInformation()
+        _gstreamer_available = any(
+            line.strip().startswith("GStreamer:") and "YES" in line
+            for line in build_info.splitlines()
+        )
+    return _gstreamer_available
+
+
+def open_capture(rtsp_url):
+    """
+    Open an RTSP stream, preferring a hardware-decoding GStreamer pipeline
+    Returns: (cap, decoder) where decoder is "gstreamer" or "ffmpeg"
+    """
+    if USE_HW_DECODE and gstreamer_available():
+        cap = cv2.VideoCapture(GST_PIPELINE.format(url=rtsp_url), cv2.CAP_GSTREAMER)
+        if cap.isOpened():
+            return cap, "gstreamer"
+        cap.release()
+
+    # Same method as production. The constructor blocks until the stream
+    # opens or FFmpeg's open timeout expires - no polling needed
+    cap = cv2.VideoCapture(rtsp_url, cv2.CAP_FFMPEG, [
+        cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, OPEN_TIMEOUT_MS,
+        cv2.CAP_PROP_READ_TIMEOUT_MSEC, READ_TIMEOUT_MS
+    ])
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap, "ffmpeg"
+
+
+def capture_camera_screenshots(channel, rtsp_url=None):
     """
     Capture multiple screenshots from a single camera
+    rtsp_url: prebuilt URL from the channel table (built here if omitted)
     Returns: dict with results
     """
     result = {
@@ -46,25 +109,21 @@ def capture_camera_screenshots(channel):
         "status": "unknown",
         "screenshots": [],
         "codec": None,
+        "decoder": None,
         "resolution": None,
         "errors": []
     }
 
-    rtsp_url = get_rtsp_url(channel, "s0")
+    if rtsp_url is None:
+        rtsp_url = get_rtsp_url(channel, "s0")
     camera_dir = OUTPUT_DIR / f"channel_{channel}"
     camera_dir.mkdir(exist_ok=True)
 
     print(f"[CH {channel:02d}] Connecting...")
 
     try:
-        # Connect using same method as production
-        cap = cv2.VideoCapture(rtsp_url, cv2.CAP_FFMPEG)
-        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-
-        # Wait for connection (max 5 seconds)
-        start_time = time.time()
-        while not cap.isOpened() and (time.time() - start_time) < 5:
-            time.sleep(0.1)
+        cap, decoder = open_capture(rtsp_url)
+        result["decoder"] = decoder
 
         if not cap.isOpened():
             result["status"] = "connection_failed"
@@ -74,7 +133,8 @@ def capture_camera_screenshots(channel):
 
         # Get codec info
         fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
-        codec = "".join([chr((fourcc >> 8 * i) & 0xFF) for i in range(4)])
+        # GStreamer appsink delivers raw BGR, so no codec fourcc is reported
+        codec = "".join([chr((fourcc >> 8 * i) & 0xFF) for i in range(4)]) if fourcc else "N/A"
         width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
@@ -84,7 +144,20 @@ def capture_camera_screenshots(channel):
         # Capture 5 screenshots
         successful_captures = 0
         for i in range(SCREENSHOTS_PER_CAMERA):
-            ret, frame = cap.read()
+            if i == 0:
+                ret, frame = cap.read()
+            else:
+                # Keep pulling packets with grab() for the capture interval
+                # instead of sleeping, then convert only the latest frame.
+                # Sleeping let packets pile up in FFmpeg's queue, so read()
+                # returned a stale frame; grab() skips the BGR conversion
+                ret = False
+                deadline = time.monotonic() + CAPTURE_INTERVAL
+                while time.monotonic() < deadline:
+                    ret = cap.grab()
+                    if not ret:
+                        break
+                ret, frame = cap.retrieve() if ret else (False, None)
 
             if ret and frame is not None:
                 # Check if frame is valid
@@ -114,9 +187,11 @@ def capture_camera_screenshots(channel):
             else:
                 result["errors"].append(f"Frame {i+1} failed")
 
-            # Wait between captures
-            if i < SCREENSHOTS_PER_CAMERA - 1:
-                time.sleep(CAPTURE_INTERVAL)
+                # The first read doubles as the connectivity probe: if it fails,
+                # skip the remaining captures (each would wait out the read
+                # timeout plus the capture interval)
+                if successful_captures == 0 and i == 0:
+                    break
 
         cap.release()
 
@@ -364,6 +439,7 @@ def generate_html_report(results):
             <div class="camera-info">
                 <span>Codec: <b>{r["codec"] or "N/A"}</b></span>
                 <span>Resolution: <b>{r["resolution"] or "N/A"}</b></span>
+                <span>Decoder: <b>{r.get("decoder") or "N/A"}</b></span>
             </div>
 '''
 
@@ -439,9 +515,13 @@ def main():
     results = []
     start_time = time.time()
 
+    # Build the channel -> RTSP URL table once
+    rtsp_urls = {channel: get_rtsp_url(channel, "s0")
+                 for channel in range(1, NVR_CONFIG['total_cameras'] + 1)}
+
     # Test cameras sequentially (to avoid overwhelming NVR)
-    for channel in range(1, NVR_CONFIG['total_cameras'] + 1):
-        result = capture_camera_screenshots(channel)
+    for channel, rtsp_url in rtsp_urls.items():
+        result = capture_camera_screenshots(channel, rtsp_url)
         results.append(result)
 
     elapsed = time.time() - start_time
@@ -456,8 +536,8 @@ def main():
 
     # Save JSON results
     json_path = OUTPUT_DIR / "test_results.json"
-    with open(json_path, 'w') as f:
-        json.dump(results, f, indent=2)
+    with open(json_path, 'wb') as f:
+        f.write(dump_json_bytes(results))
     print(f"📋 JSON Data: {json_path}")
 
     # Open HTML in browser
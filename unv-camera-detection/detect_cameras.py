@@ -9,6 +9,7 @@ Detects Uniview (UNV) IP cameras on the local network using multiple methods:
 """
 
 import argparse
+import asyncio
 import socket
 import subprocess
 import sys
@@ -52,6 +53,9 @@ class UNVCameraDetector:
     DEFAULT_USERNAME = "admin"
     DEFAULT_PASSWORD = "123456"
 
+    # Upper bound on simultaneous TCP connects during the async port sweep
+    MAX_CONCURRENT_CONNECTS = 512
+
     # ONVIF WS-Discovery multicast address and port
     ONVIF_MULTICAST_IP = "239.255.255.250"
     ONVIF_MULTICAST_PORT = 3702
@@ -93,6 +97,38 @@ class UNVCameraDetector:
         except Exception:
             return False
 
+    async def _check_port_async(self, ip: str, port: int, limit: asyncio.Semaphore) -> bool:
+        """Async TCP connect check (no thread per probe)"""
+        async with limit:
+            try:
+                _, writer = await asyncio.wait_for(
+                    asyncio.open_connection(ip, port), timeout=self.timeout
+                )
+            except (OSError, asyncio.TimeoutError):
+                return False
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+            return True
+
+    async def _scan_ports_async(self, ips: list[str], ports: list[int]) -> dict[str, set[int]]:
+        limit = asyncio.Semaphore(self.MAX_CONCURRENT_CONNECTS)
+        targets = [(ip, port) for ip in ips for port in ports]
+        results = await asyncio.gather(
+            *(self._check_port_async(ip, port, limit) for ip, port in targets)
+        )
+        open_ports: dict[str, set[int]] = {}
+        for (ip, port), is_open in zip(targets, results):
+            if is_open:
+                open_ports.setdefault(ip, set()).add(port)
+        return open_ports
+
+    def scan_ports(self, ips: list[str], ports: list[int]) -> dict[str, set[int]]:
+        """Check every (ip, port) pair concurrently in one event loop; returns open ports per IP"""
+        return asyncio.run(self._scan_ports_async(list(ips), ports))
+
     def discover_onvif_devices(self) -> list[str]:
         """Discover ONVIF devices using WS-Discovery"""
         discovered_ips = []
@@ -193,11 +229,15 @@ class UNVCameraDetector:
                 pass
         return None
 
-    def scan_ip(self, ip: str) -> Optional[CameraInfo]:
-        """Scan a single IP for UNV camera"""
+    def scan_ip(self, ip: str, open_ports: Optional[set[int]] = None) -> Optional[CameraInfo]:
+        """Scan a single IP for UNV camera (open_ports from scan_ports, if already known)"""
         # Check if port 80 or 443 is open
-        has_http = self.scan_port(ip, 80)
-        has_https = self.scan_port(ip, 443)
+        if open_ports is None:
+            has_http = self.scan_port(ip, 80)
+            has_https = self.scan_port(ip, 443)
+        else:
+            has_http = 80 in open_ports
+            has_https = 443 in open_ports
 
         if not has_http and not has_https:
             return None
@@ -288,10 +328,18 @@ class UNVCameraDetector:
 
         print(f"\n[*] Checking {len(candidate_ips)} candidate IPs for UNV cameras...")
 
-        # Scan all candidates in parallel
+        # Sweep HTTP/HTTPS ports for all candidates in a single event loop,
+        # then only query hosts that answered
+        open_ports = self.scan_ports(candidate_ips, [80, 443])
+        print(f"  {len(open_ports)} hosts with a web port open")
+
+        # Query responsive hosts in parallel (requests is blocking)
         found_cameras = []
         with concurrent.futures.ThreadPoolExecutor(max_workers=50) as executor:
-            future_to_ip = {executor.submit(self.scan_ip, ip): ip for ip in candidate_ips}
+            future_to_ip = {
+                executor.submit(self.scan_ip, ip, ports): ip
+                for ip, ports in open_ports.items()
+            }
             for future in concurrent.futures.as_completed(future_to_ip):
                 result = future.result()
                 if result: